@@ -6,7 +6,7 @@ class ActionCardPopup:
     def __init__(self, parent, position, options, texture, font_path=None, scale=0.8):
         """
         options: dict mapping option_key -> (label, callback)
-        texture: path to your popup card PNG
+        texture: path to your popup card PNG, loaded once through base.assets
         font_path: path to your Sierra-style .ttf
         scale: overall size of the card (fraction of screen)
         """
@@ -18,7 +18,7 @@ class ActionCardPopup:
         # 1) Draw the card background
         aspect = base.getAspectRatio()
         self.card = OnscreenImage(
-            image=texture,
+            image=base.assets.texture(texture),
 #            pos=(parent.getX(), parent.getY(), parent.getZ()),
             pos=position,
             scale=(scale * aspect, 1, scale),
@@ -28,7 +28,7 @@ class ActionCardPopup:
 
         # 2) Load your pixel/serif font
         if font_path:
-            self.font = loader.loadFont(font_path)
+            self.font = base.assets.font(font_path)
 
         # 3) Define clickable regions (normalized coords)
         #    Here we stack options vertically. Adjust y_start/dy to taste.
@@ -69,6 +69,11 @@ class ActionCardPopup:
         self.selected_index = (self.selected_index + delta) % count
         self._update_highlight()
 
+    def select(self, key):
+        """moves the highlight to the given option"""
+        self.selected_index = list(self.options.keys()).index(key)
+        self._update_highlight()
+
     def _update_highlight(self):
         for idx, np in enumerate(self.text_nodes):
             if idx == self.selected_index:
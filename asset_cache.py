@@ -0,0 +1,179 @@
+"""shared cache for textures, fonts and shaders
+
+Every screen used to load its own copy of what it draws: the title and
+the settings page both loaded the Orbitron font, the characters page
+reloaded its background and recompiled the blur shader each time it
+opened, and every action card popup reloaded the panel texture.
+
+The cache hands out one instance per asset and keeps the most recently
+used ones within a memory budget. While a screen is showing, the assets
+of the next one are loaded on a task chain of their own, in a thread on
+desktop and a little per frame in the browser where there are no
+threads, so changing screen does not wait on the disk.
+"""
+from collections import OrderedDict
+import logging
+import os
+import sys
+import threading
+
+from panda3d.core import FontPool, Shader, TexturePool
+
+BOLD_FONT = "assets/fonts/Orbitron/static/Orbitron-Bold.ttf"
+GAUSSIAN_SHADER = ("assets/shaders/blur.vert", "assets/shaders/gaussian.frag")
+COMPOSITE_SHADER = ("assets/shaders/blur.vert", "assets/shaders/composite.frag")
+
+# bytes of loaded assets kept alive by the cache
+ASSET_BUDGET = int(os.environ.get("ASSET_BUDGET_MB", "64")) * 1024 * 1024
+# fonts rasterize glyphs into pages, a rough guess of what one costs
+FONT_COST = 256 * 1024
+
+# what each screen draws, preloaded while the screen before it is showing
+SCREEN_ASSETS = {
+    "settings": {
+        "fonts": [BOLD_FONT],
+        "textures": ["assets/bg_characters.png"],
+        "shaders": [GAUSSIAN_SHADER, COMPOSITE_SHADER],
+    },
+    "game": {
+        # the dice are packed into an atlas from the images, see dice.py
+        "textures": ["assets/stagno.png", "assets/forest.png", "assets/tile.png",
+                     "assets/monopoly_panel.png"],
+    },
+}
+
+PRELOAD_CHAIN = "assetPreload"
+
+
+class AssetCache:
+    """one instance per asset, least recently used ones dropped past the budget"""
+
+    def __init__(self, base, budget=ASSET_BUDGET):
+        self.base = base
+        self.budget = budget
+        self.used = 0
+        # key -> (kind, asset, cost), oldest first
+        self.entries = OrderedDict()
+        # the preload chain may run in another thread
+        self.lock = threading.Lock()
+        self.queue = []
+        self.preloading = False
+        # loaded off the render task, uploaded to the gpu on it
+        self.to_prepare = []
+
+        base.taskMgr.setupTaskChain(
+            PRELOAD_CHAIN,
+            numThreads=0 if sys.platform == "emscripten" else 1,
+            frameSync=False,
+        )
+
+    # lookups, they load synchronously when the asset is not cached yet
+
+    def texture(self, path):
+        return self._get(("texture", path), self._load_texture)
+
+    def font(self, path):
+        return self._get(("font", path), self._load_font)
+
+    def shader(self, vertex, fragment):
+        return self._get(("shader", vertex, fragment), self._load_shader)
+
+    def generated(self, name, build):
+        """an asset made at runtime, build(name) returns (asset, cost)"""
+        return self._get(("generated", name), build)
+
+    def _get(self, key, load):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry[1]
+        asset, cost = load(*key[1:])
+        self._store(key, asset, cost)
+        return asset
+
+    def _load_texture(self, path):
+        texture = self.base.loader.loadTexture(path)
+        return texture, texture.estimateTextureMemory()
+
+    def _load_font(self, path):
+        return self.base.loader.loadFont(path), FONT_COST
+
+    def _load_shader(self, vertex, fragment):
+        shader = Shader.load(Shader.SL_GLSL, vertex, fragment)
+        if shader is None:
+            raise IOError(f"could not load shader {vertex}")
+        return shader, os.path.getsize(vertex) + os.path.getsize(fragment)
+
+    def _store(self, key, asset, cost):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = (key[0], asset, cost)
+            self.used += cost
+            while self.used > self.budget and len(self.entries) > 1:
+                old_key, (kind, old, old_cost) = self.entries.popitem(last=False)
+                self.used -= old_cost
+                # panda keeps its own pools, drop the asset there too so
+                # it is freed once the scene stops using it
+                if kind == "texture":
+                    TexturePool.releaseTexture(old)
+                elif kind == "font":
+                    FontPool.releaseFont(old_key[1])
+                logging.info("asset cache evicted %s", old_key[1])
+
+    def cached(self, key):
+        with self.lock:
+            return key in self.entries
+
+    # background loading
+
+    def preload_screen(self, screen):
+        """queues everything a screen draws, see SCREEN_ASSETS"""
+        assets = SCREEN_ASSETS[screen]
+        self.preload(assets.get("textures", ()), assets.get("fonts", ()), assets.get("shaders", ()))
+
+    def preload(self, textures=(), fonts=(), shaders=()):
+        """loads assets on the preload chain, one per step"""
+        with self.lock:
+            start = not self.preloading
+            self.preloading = True
+            self.queue.extend([(("texture", path), self._load_texture) for path in textures]
+                              + [(("font", path), self._load_font) for path in fonts]
+                              + [(("shader",) + tuple(pair), self._load_shader) for pair in shaders])
+        if start:
+            self.base.taskMgr.add(self._preload_task, "assetPreloadTask", taskChain=PRELOAD_CHAIN)
+            self.base.taskMgr.add(self._prepare_task, "assetPrepareTask")
+
+    def _preload_task(self, task):
+        with self.lock:
+            if not self.queue:
+                self.preloading = False
+                return task.done
+            # left queued until stored, so the prepare task waits for it
+            key, load = self.queue[0]
+        if not self.cached(key):
+            try:
+                asset, cost = load(*key[1:])
+            except IOError:
+                logging.info("asset cache could not preload %s", key[1])
+            else:
+                self._store(key, asset, cost)
+                if key[0] == "texture":
+                    with self.lock:
+                        self.to_prepare.append(asset)
+        with self.lock:
+            self.queue.pop(0)
+        return task.cont
+
+    def _prepare_task(self, task):
+        """queues the preloaded textures for upload with the next frame"""
+        gsg = self.base.win.getGsg() if self.base.win else None
+        with self.lock:
+            textures, self.to_prepare = self.to_prepare, []
+            idle = not self.preloading
+        if gsg:
+            for texture in textures:
+                texture.prepare(gsg.getPreparedObjects())
+        return task.done if idle and not textures else task.cont
@@ -0,0 +1,28 @@
+// composite.frag
+#version 120
+
+uniform sampler2D p3d_Texture0;
+// the background blurred once, see blur.py
+uniform sampler2D blurred;
+uniform vec4 box;      // x, y, width, height in UV coords
+varying vec2 texcoord;
+
+// is uv inside the focus box?
+bool inBox(vec2 uv, vec4 b) {
+    return uv.x >= b.x && uv.x <= (b.x + b.z)
+        && uv.y >= b.y && uv.y <= (b.y + b.w);
+}
+
+void main() {
+    vec4 col;
+
+    // outside the box → blurred and tinted, else keep sharp
+    if (inBox(texcoord, box)) {
+        col = texture2D(p3d_Texture0, texcoord);
+    } else {
+        col = texture2D(blurred, texcoord);
+        col.rgb = mix(col.rgb, vec3(0.2, 0.0, 0.4), 0.5);
+    }
+
+    gl_FragColor = col;
+}
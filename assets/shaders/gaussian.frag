@@ -0,0 +1,19 @@
+// gaussian.frag
+#version 120
+
+uniform sampler2D p3d_Texture0;
+// one texel along the blur axis, (1/width, 0) or (0, 1/height)
+uniform vec2 direction;
+varying vec2 texcoord;
+
+// 9-tap gaussian folded into 5 bilinear fetches, unrolled for GLSL ES
+void main() {
+    vec2 near = direction * 1.3846153846;
+    vec2 far  = direction * 3.2307692308;
+    vec4 sum = texture2D(p3d_Texture0, texcoord) * 0.2270270270;
+    sum += texture2D(p3d_Texture0, texcoord + near) * 0.3162162162;
+    sum += texture2D(p3d_Texture0, texcoord - near) * 0.3162162162;
+    sum += texture2D(p3d_Texture0, texcoord + far) * 0.0702702703;
+    sum += texture2D(p3d_Texture0, texcoord - far) * 0.0702702703;
+    gl_FragColor = sum;
+}
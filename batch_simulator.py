@@ -0,0 +1,273 @@
+"""vectorized batch simulator
+
+Runs the rules of game_rules.py for many games at once. Positions, gold,
+powers and ownership of every game are kept in NumPy arrays and all the
+games advance one turn per step, so a million games take minutes instead
+of hours.
+
+    python batch_simulator.py --games 1000000 --power-bonus 30 --power-cheaper-upgrades 10
+    python batch_simulator.py --parity --games 2000 --max-turns 30
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+
+import numpy as np
+
+from board import make_board
+from game_rules import (
+    BOT, HUMAN, MAX_TURNS, POWER_BONUS, POWER_CHEAPER_UPGRADES, RENT_PERCENT, STARTING_MONEY,
+    GameRules, GameState
+)
+from ledger import GROUP_RENT_BONUS
+
+# power codes stored in the powers array
+CHEAPER_UPGRADES = 0
+BONUS = 1
+POWER_NAMES = ("cheaper_upgrades", "bonus")
+
+# column of each actor, the human always plays first
+HUMAN_COL = 0
+BOT_COL = 1
+
+NO_OWNER = -1
+NO_LOSER = -1
+
+
+class BatchSimulator:
+    """N games in lockstep, one vectorized step per turn"""
+
+    def __init__(self, n_games, board_size=20, n_boards=256,
+                 power_bonus=POWER_BONUS, power_cheaper_upgrades=POWER_CHEAPER_UPGRADES,
+                 starting_money=STARTING_MONEY, max_turns=MAX_TURNS,
+                 roll_block=64, seed=None):
+        self.n_games = n_games
+        self.board_size = board_size
+        self.power_bonus = power_bonus
+        self.power_cheaper_upgrades = power_cheaper_upgrades
+        self.starting_money = starting_money
+        self.max_turns = max_turns
+        self.roll_block = roll_block
+        self.rng = np.random.default_rng(seed)
+
+        # boards are generated with the real generator and shared between games
+        board_rng = random.Random(int(self.rng.integers(2**63)))
+        n_boards = min(n_boards, n_games)
+        self.boards = []
+        self.prices = np.zeros((n_boards, board_size), dtype=np.int32)
+        # color group of each card and tiles in each group, as in ledger.py;
+        # int32 as a big board has tens of thousands of groups and specials
+        self.groups = np.zeros((n_boards, board_size), dtype=np.int32)
+        self.group_sizes = np.zeros((n_boards, board_size + 1), dtype=np.int32)
+        for b in range(n_boards):
+            board = make_board(board_size, board_rng)
+            self.boards.append(board)
+            self.prices[b] = np.fromiter(board.prices, dtype=np.int32, count=board_size)
+            self.groups[b] = np.fromiter(board.groups, dtype=np.int32, count=board_size)
+            self.group_sizes[b] = np.bincount(self.groups[b][self.groups[b] >= 0], minlength=board_size + 1)
+        self.board_ids = self.rng.integers(0, n_boards, size=n_games)
+
+        self.games = np.arange(n_games)
+        self.positions = np.zeros((n_games, 2), dtype=np.int32)
+        self.gold = np.full((n_games, 2), starting_money, dtype=np.int64)
+        human_power = self.rng.integers(0, 2, size=n_games, dtype=np.int8)
+        self.powers = np.stack([human_power, 1 - human_power], axis=1)
+        self.owners = np.full((n_games, board_size), NO_OWNER, dtype=np.int8)
+        # cards of each group owned by each actor
+        self.group_counts = np.zeros((n_games, 2, board_size + 1), dtype=np.int32)
+        self.loser = np.full(n_games, NO_LOSER, dtype=np.int8)
+        self.done = np.zeros(n_games, dtype=bool)
+        self.turns = np.zeros(n_games, dtype=np.int32)
+        self.step_count = 0
+
+        self._rolls = None
+        self._roll_cursor = 0
+        # sums rolled by the last step, see parity()
+        self.last_roll = None
+
+    def _next_roll(self):
+        """2d6 sums for every game, drawn in blocks of roll_block turns"""
+        if self._rolls is None or self._roll_cursor == self.roll_block:
+            dice = self.rng.integers(1, 7, size=(self.roll_block, self.n_games, 2), dtype=np.int8)
+            self._rolls = dice.sum(axis=2, dtype=np.int32)
+            self._roll_cursor = 0
+        roll = self._rolls[self._roll_cursor]
+        self._roll_cursor += 1
+        return roll
+
+    def step(self):
+        """one turn for the current actor of every running game"""
+        actor = self.step_count % 2
+        other = 1 - actor
+        self.step_count += 1
+
+        active = ~self.done
+        self.turns[active] += 1
+
+        # start_turn: check_victory, the human is checked first, then
+        # check_powers, paid whatever the victory check found
+        broke = active & (self.gold <= 0).any(axis=1)
+        human_broke = broke & (self.gold[:, HUMAN_COL] <= 0)
+        self.loser[broke] = np.where(human_broke[broke], HUMAN_COL, BOT_COL)
+        self.done |= broke
+        bonus = active & (self.powers[:, actor] == BONUS)
+        self.gold[bonus, actor] += self.power_bonus
+
+        # check_turn_limit, once the bonus is paid; the richest player wins
+        self.done |= active & (self.turns > self.max_turns)
+        active = ~self.done
+
+        # roll and move
+        roll = self._next_roll()
+        self.last_roll = roll
+        self.positions[active, actor] = (self.positions[active, actor] + roll[active]) % self.board_size
+
+        games = self.games[active]
+        tiles = self.positions[games, actor]
+        boards = self.board_ids[games]
+        prices = self.prices[boards, tiles]
+        groups = self.groups[boards, tiles]
+        owners = self.owners[games, tiles]
+
+        # pay rent to the opponent, more when it holds the whole group
+        renting = owners == other
+        rent = prices[renting] * RENT_PERCENT // 100
+        complete = (self.group_counts[games[renting], other, groups[renting]]
+                    == self.group_sizes[boards[renting], groups[renting]])
+        rent = np.where(complete, rent * GROUP_RENT_BONUS, rent)
+        self.gold[games[renting], actor] -= rent
+        self.gold[games[renting], other] += rent
+
+        # buy free cards the actor can afford
+        cost = np.where(self.powers[games, actor] == CHEAPER_UPGRADES,
+                        prices - prices * self.power_cheaper_upgrades // 100, prices)
+        buying = (owners == NO_OWNER) & (prices > 0) & (self.gold[games, actor] > cost)
+        self.gold[games[buying], actor] -= cost[buying]
+        self.owners[games[buying], tiles[buying]] = actor
+        self.group_counts[games[buying], actor, groups[buying]] += 1
+
+    def run(self):
+        """steps until every game is over"""
+        while not self.done.all():
+            self.step()
+        return self.results()
+
+    def winners(self):
+        """column of the winner for each game, -1 on a tie"""
+        richest = np.where(self.gold[:, HUMAN_COL] > self.gold[:, BOT_COL], HUMAN_COL, BOT_COL)
+        richest[self.gold[:, HUMAN_COL] == self.gold[:, BOT_COL]] = -1
+        return np.where(self.loser == NO_LOSER, richest, 1 - self.loser)
+
+    def results(self):
+        """win counts by power"""
+        winners = self.winners()
+        decided = winners >= 0
+        winning_power = self.powers[self.games[decided], winners[decided]]
+        return {
+            "games": int(self.n_games),
+            "wins_bonus": int((winning_power == BONUS).sum()),
+            "wins_cheaper_upgrades": int((winning_power == CHEAPER_UPGRADES).sum()),
+            "ties": int((~decided).sum()),
+            "bankrupt": int((self.loser != NO_LOSER).sum()),
+            "mean_turns": float(self.turns.mean()),
+        }
+
+
+def parity(n_games=2000, max_turns=30, seed=0, **kwargs):
+    """plays the games of a BatchSimulator again with GameRules, on the same
+    boards, powers and rolls, returns the indexes of the games that end
+    differently; a small max_turns puts most of them on the turn limit"""
+    sim = BatchSimulator(n_games, max_turns=max_turns, seed=seed, **kwargs)
+    rolls = []
+    while not sim.done.all():
+        sim.step()
+        rolls.append(sim.last_roll)
+    rules = GameRules(board_size=sim.board_size, power_bonus=sim.power_bonus,
+                      power_cheaper_upgrades=sim.power_cheaper_upgrades,
+                      starting_money=sim.starting_money, max_turns=max_turns)
+
+    differ = []
+    for game in range(n_games):
+        inventories = {
+            actor: {"power": POWER_NAMES[sim.powers[game, col]], "money": sim.starting_money, "cards": [{}]}
+            for actor, col in ((HUMAN, HUMAN_COL), (BOT, BOT_COL))
+        }
+        state = GameState(sim.boards[sim.board_ids[game]], inventories)
+        # GameRules.advance, with the rolls of the batch
+        while True:
+            rules.start_turn(state)
+            if rules.check_turn_limit(state):
+                break
+            rules.move(state, int(rolls[state.turn - 1][game]))
+            rules.settle(state)
+
+        expected = (int(sim.turns[game]), int(sim.gold[game, HUMAN_COL]), int(sim.gold[game, BOT_COL]),
+                    None if sim.loser[game] == NO_LOSER else (HUMAN, BOT)[sim.loser[game]])
+        if (state.turn, state.inventories[HUMAN]["money"], state.inventories[BOT]["money"], state.loser) != expected:
+            differ.append(game)
+    return differ
+
+
+def simulate(n_games, chunk=100000, seed=None, **kwargs):
+    """runs n_games in chunks to bound memory, returns the merged results"""
+    seeds = np.random.SeedSequence(seed).spawn((n_games + chunk - 1) // chunk)
+    totals = {}
+    played = 0
+    for chunk_seed in seeds:
+        size = min(chunk, n_games - played)
+        results = BatchSimulator(size, seed=chunk_seed, **kwargs).run()
+        for key, value in results.items():
+            if key == "mean_turns":
+                value *= size
+            totals[key] = totals.get(key, 0) + value
+        played += size
+    totals["mean_turns"] /= n_games
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="simulate many games at once")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--chunk", type=int, default=100000)
+    parser.add_argument("--board-size", type=int, default=20)
+    parser.add_argument("--boards", type=int, default=256)
+    parser.add_argument("--power-bonus", type=int, default=POWER_BONUS)
+    parser.add_argument("--power-cheaper-upgrades", type=int, default=POWER_CHEAPER_UPGRADES)
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--parity", action="store_true",
+                        help="check --games games against GameRules instead, see parity()")
+    args = parser.parse_args(argv)
+
+    if args.parity:
+        start = time.perf_counter()
+        differ = parity(args.games, max_turns=args.max_turns, seed=args.seed,
+                        board_size=args.board_size, n_boards=args.boards,
+                        power_bonus=args.power_bonus, power_cheaper_upgrades=args.power_cheaper_upgrades)
+        logging.info("%d games checked in %.1f s", args.games, time.perf_counter() - start)
+        print(f"{len(differ)} of {args.games} games differ from GameRules {differ[:10]}")
+        return 1 if differ else 0
+
+    start = time.perf_counter()
+    results = simulate(
+        args.games,
+        chunk=args.chunk,
+        seed=args.seed,
+        board_size=args.board_size,
+        n_boards=args.boards,
+        power_bonus=args.power_bonus,
+        power_cheaper_upgrades=args.power_cheaper_upgrades,
+        max_turns=args.max_turns,
+    )
+    elapsed = time.perf_counter() - start
+
+    logging.info("%d games in %.1f s", args.games, elapsed)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""benchmarks of the hot paths
+
+Times board generation at several sizes, headless turns, the scene built
+by _draw_game in an offscreen window and the action card popup, writes
+the results as JSON and compares them with a stored baseline:
+
+    python benchmarks.py --save-baseline              # on the reference build
+    python benchmarks.py --out results.json           # exit code 1 on a regression
+    python benchmarks.py --only board,turns           # no window needed
+
+Every benchmark reports the median and the best of a few repeats, in
+seconds per call; the median is what gets compared.
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import statistics
+import sys
+import time
+
+from board import LAZY_THRESHOLD, make_board
+from game_rules import GameRules
+
+BASELINE = "benchmark_baseline.json"
+# a benchmark regressed when its median is this much slower than the baseline
+TOLERANCE = 0.25
+BOARD_SIZES = (20, 200, 500, 1000, 100_000, 10_000_000)
+GROUPS = ("board", "turns", "scene")
+
+
+def measure(fn, number=1, repeat=7):
+    """seconds per call of fn, median and best of repeat runs of number calls"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return {"median": statistics.median(times), "min": min(times), "number": number, "repeat": repeat}
+
+
+def bench_board(results, sizes=BOARD_SIZES):
+    """make_board plus the first window the lanes show, a lazy board
+    builds its chunks on that first read"""
+    for size in sizes:
+        rng = random.Random(size)
+
+        def generate():
+            board = make_board(size, rng)
+            middle = len(board) // 2
+            return [board.name(i) for i in range(middle, min(middle + 8, len(board)))]
+
+        number = 20 if size <= LAZY_THRESHOLD else 1000
+        results[f"board.make_board[{size}]"] = measure(generate, number=number)
+
+
+def bench_turns(results, games=500, board_size=20):
+    """seconds per headless turn, games played to the end"""
+    turns = []
+
+    def play():
+        rules = GameRules(board_size=board_size, rng=random.Random(len(turns)))
+        state = rules.new_game()
+        while not state.over:
+            rules.play_turn(state)
+        turns.append(state.turn)
+
+    start = time.perf_counter()
+    results["turns.game"] = measure(play, number=games // 5)
+    elapsed = time.perf_counter() - start
+    results["turns.turn"] = {"median": elapsed / sum(turns), "min": elapsed / sum(turns),
+                             "number": sum(turns), "repeat": 1}
+
+
+def bench_scene(results, window_type="offscreen", display=None):
+    """_draw_game and the popup in a real, offscreen, Panda3D window"""
+    from panda3d.core import loadPrcFileData
+    loadPrcFileData("", f"window-type {window_type}\naudio-library-name null")
+    if display:
+        loadPrcFileData("", f"load-display {display}")
+    import main
+    from action_card_popup import ActionCardPopup
+
+    app = main.Monopoly2d()
+    app.taskMgr.step()
+    # the title screen is in the way, nothing of it is timed
+    app.titlescreen.cleanup()
+
+    def clear():
+        for child in app.aspect2d.getChildren():
+            child.removeNode()
+
+    def draw():
+        clear()
+        app._draw_game()
+        app.graphicsEngine.renderFrame()
+
+    results["scene.draw_game"] = measure(draw)
+
+    def popup():
+        card = ActionCardPopup(
+            parent=app.right_view.content,
+            position=app.right_view.card_pos(0),
+            options={key: (key, lambda: None) for key in ("buy", "rent", "auction", "pass")},
+            texture="assets/monopoly_panel.png",
+            scale=0.7,
+        )
+        app.graphicsEngine.renderFrame()
+        card.destroy()
+
+    results["scene.popup"] = measure(popup, number=5)
+    app.destroy()
+
+
+def run(groups, args):
+    results = {}
+    for group in groups:
+        start = time.perf_counter()
+        if group == "board":
+            bench_board(results)
+        elif group == "turns":
+            bench_turns(results)
+        elif group == "scene":
+            bench_scene(results, args.window_type, args.display)
+        logging.info("%s benchmarks in %.1f s", group, time.perf_counter() - start)
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """one row per benchmark, and whether any of them regressed"""
+    rows, regressed = [], False
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            rows.append((name, result["median"], None, None, "new"))
+            continue
+        ratio = result["median"] / reference["median"] if reference["median"] else float("inf")
+        status = "ok"
+        if ratio > 1 + tolerance:
+            status, regressed = "SLOWER", True
+        elif ratio < 1 - tolerance:
+            status = "faster"
+        rows.append((name, result["median"], reference["median"], ratio, status))
+    return rows, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="time the hot paths and compare with a baseline")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"comma separated groups of {', '.join(GROUPS)}")
+    parser.add_argument("--out", help="JSON file for the results")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--window-type", default="offscreen")
+    parser.add_argument("--display", help="display module, e.g. p3tinydisplay when there is no GL")
+    args = parser.parse_args(argv)
+
+    groups = [group for group in args.only.split(",") if group]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups {', '.join(sorted(unknown))}")
+
+    results = run(groups, args)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        logging.info("baseline saved to %s", args.baseline)
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    except OSError:
+        logging.info("no baseline at %s, nothing to compare with", args.baseline)
+        baseline = {}
+
+    rows, regressed = compare(results, baseline, args.tolerance)
+    for name, median, reference, ratio, status in rows:
+        reference_text = f"{reference * 1e3:10.3f} ms" if reference is not None else " " * 13
+        ratio_text = f"{ratio:6.2f}x" if ratio is not None else " " * 7
+        print(f"{name:32} {median * 1e3:10.3f} ms {reference_text} {ratio_text}  {status}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""cached gaussian blur of a static texture
+
+The characters page used to blur its background in the fragment shader
+of the full-screen card, every fragment of every frame, although the
+background never changes. blur_texture renders a separable gaussian once
+instead: a horizontal pass into a small offscreen buffer, a vertical pass
+into a second one copied to ram, after which both buffers are dropped.
+The page then only composites the sharp box over the cached result.
+"""
+from panda3d.core import (
+    Camera, CardMaker, NodePath, OrthographicLens, SamplerState, Vec2
+)
+
+from asset_cache import GAUSSIAN_SHADER
+
+# the blur runs at 1/BLUR_DOWNSCALE of the texture size
+BLUR_DOWNSCALE = 4
+
+
+def _blur_pass(base, name, source, size, direction, sort, to_ram=False):
+    """renders source through the gaussian shader into a new buffer"""
+    width, height = size
+    buffer = base.win.makeTextureBuffer(name, width, height, to_ram=to_ram)
+    if buffer is None:
+        return None, None
+    buffer.setSort(sort)
+    buffer.setOneShot(True)
+
+    scene = NodePath(f"{name}-scene")
+    lens = OrthographicLens()
+    lens.setFilmSize(2, 2)
+    lens.setNearFar(-10, 10)
+    camera = scene.attachNewNode(Camera(f"{name}-camera", lens))
+    region = buffer.makeDisplayRegion()
+    region.setCamera(camera)
+
+    cm = CardMaker(f"{name}-card")
+    cm.setFrameFullscreenQuad()
+    card = scene.attachNewNode(cm.generate())
+    card.setTexture(source)
+    card.setShader(base.assets.shader(*GAUSSIAN_SHADER))
+    card.setShaderInput("direction", direction)
+    return buffer, buffer.getTexture()
+
+
+def blur_texture(base, source, downscale=BLUR_DOWNSCALE):
+    """a blurred copy of source, None when the gsg cannot render it"""
+    gsg = base.win.getGsg() if base.win else None
+    if gsg is None or not gsg.getSupportsBasicShaders():
+        return None
+
+    size = (max(1, source.getXSize() // downscale), max(1, source.getYSize() // downscale))
+    horizontal, half_blurred = _blur_pass(
+        base, "blur-h", source, size, Vec2(1.0 / size[0], 0), sort=-20)
+    if horizontal is None:
+        return None
+    vertical, blurred = _blur_pass(
+        base, "blur-v", half_blurred, size, Vec2(0, 1.0 / size[1]), sort=-19, to_ram=True)
+    if vertical is None:
+        base.graphicsEngine.removeWindow(horizontal)
+        return None
+
+    # one frame renders both passes, then only the ram copy is kept
+    base.graphicsEngine.renderFrame()
+    base.graphicsEngine.removeWindow(horizontal)
+    base.graphicsEngine.removeWindow(vertical)
+
+    blurred.setMinfilter(SamplerState.FT_linear)
+    blurred.setMagfilter(SamplerState.FT_linear)
+    blurred.setWrapU(SamplerState.WM_clamp)
+    blurred.setWrapV(SamplerState.WM_clamp)
+    return blurred
@@ -0,0 +1,402 @@
+"""array backed board model
+
+A board is stored as parallel arrays indexed by card: type codes, prices,
+group ids and name ids. Colors are parsed once into an RGBA palette with
+one entry per group, and the cards of each group and of each type are
+indexed up front, so every lookup the game and the renderer do is O(1).
+
+Groups are the contiguous blocks, plus one group per special element
+since specials of the same kind share price and color.
+
+Very large boards use LazyBoard instead, which has the same interface
+but builds cards on demand from a seed, a chunk at a time.
+"""
+from array import array
+from collections import OrderedDict
+import math
+import random
+
+# type codes
+START = 0
+BLOCK = 1
+SPECIAL = 2
+END = 3
+TYPE_NAMES = ("start", "block", "special", "end")
+
+# start and end cannot be bought
+NO_PRICE = 0
+NO_GROUP = -1
+
+BLOCK_ELEMENTS = ["Road", "Street", "Castle", "Palace", "Corner"]
+BLOCK_TITLES = [
+    "Windsor", "Versailles", "Edinburgh", "Regent", "Victoria",
+    "Kensington", "Balmoral", "Trafalgar", "Piccadilly",
+    "Lancaster", "Dover", "Hampton", "York", "Nottingham"
+]
+SPECIAL_ELEMENTS = ["Station", "Facility", "Prison", "Hospital", "Museum", "Hotel", "Shop"]
+
+# boards bigger than this are generated lazily
+LAZY_THRESHOLD = 1000
+# cards per lazily generated chunk, a multiple of both segment sizes
+CHUNK = 24
+# chunks kept in memory by a LazyBoard
+CHUNK_CACHE = 64
+
+
+def parse_color(color):
+    """"#rrggbb" -> (r, g, b, 1.0) floats"""
+    value = int(color.lstrip("#"), 16)
+    return ((value >> 16 & 0xFF) / 255, (value >> 8 & 0xFF) / 255, (value & 0xFF) / 255, 1.0)
+
+
+class Board:
+    """cards as parallel arrays, see the module docstring"""
+
+    def __init__(self):
+        self.types = array("B")
+        self.prices = array("H")
+        self.groups = array("h")
+        self.name_ids = array("H")
+        # shared names, specials of the same kind point to the same entry
+        self.name_table = []
+        self._name_lookup = {}
+        # 4 floats per group
+        self.palette = array("f")
+        # group id -> card indexes, type code -> card indexes
+        self.group_tiles = []
+        self.type_tiles = tuple([] for _ in TYPE_NAMES)
+
+    def __len__(self):
+        return len(self.types)
+
+    def add_group(self, color):
+        """registers a group color, returns the group id"""
+        self.palette.extend(parse_color(color))
+        self.group_tiles.append([])
+        return len(self.group_tiles) - 1
+
+    def add_card(self, name, type_code, price=NO_PRICE, group=NO_GROUP):
+        """appends a card, returns its index"""
+        index = len(self.types)
+        name_id = self._name_lookup.get(name)
+        if name_id is None:
+            name_id = self._name_lookup[name] = len(self.name_table)
+            self.name_table.append(name)
+        self.types.append(type_code)
+        self.prices.append(price)
+        self.groups.append(group)
+        self.name_ids.append(name_id)
+        self.type_tiles[type_code].append(index)
+        if group != NO_GROUP:
+            self.group_tiles[group].append(index)
+        return index
+
+    def name(self, index):
+        return self.name_table[self.name_ids[index]]
+
+    def type_name(self, index):
+        return TYPE_NAMES[self.types[index]]
+
+    def price(self, index):
+        """list price, None when the card is not for sale"""
+        return self.prices[index] or None
+
+    def color(self, index):
+        """RGBA of the card's group, None for start and end"""
+        group = self.groups[index]
+        if group == NO_GROUP:
+            return None
+        return tuple(self.palette[group * 4:group * 4 + 4])
+
+    def tiles_in_group(self, group):
+        return self.group_tiles[group]
+
+    def count_in_group(self, group, limit):
+        """cards of a group, counted up to limit"""
+        return min(len(self.group_tiles[group]), limit)
+
+    def tiles_of_type(self, type_code):
+        return self.type_tiles[type_code]
+
+    def card(self, index):
+        """the card as a dict, for logs and debugging"""
+        return {
+            "name": self.name(index),
+            "type": self.type_name(index),
+            "price": self.price(index),
+            "group": self.groups[index],
+        }
+
+    @classmethod
+    def from_arrays(cls, types, prices, groups, name_ids, name_table, palette):
+        """a board from its arrays, as written by savegame.py"""
+        board = cls()
+        board.types, board.prices, board.groups, board.name_ids = types, prices, groups, name_ids
+        board.name_table = list(name_table)
+        board._name_lookup = {name: name_id for name_id, name in enumerate(board.name_table)}
+        board.palette = palette
+        board.group_tiles = [[] for _ in range(len(palette) // 4)]
+        for index, (type_code, group) in enumerate(zip(types, groups)):
+            board.type_tiles[type_code].append(index)
+            if group != NO_GROUP:
+                board.group_tiles[group].append(index)
+        return board
+
+    @classmethod
+    def generate(cls, count, rng=random):
+        """start, blocks of 2-3 cards each followed by a special, end"""
+        board = cls()
+
+        # prepare a shuffled pool of all unique block names
+        block_names_all = [
+            f"{elem} {title}"
+            for elem in BLOCK_ELEMENTS
+            for title in BLOCK_TITLES
+        ]
+        block_name_pool = list(block_names_all)
+        rng.shuffle(block_name_pool)
+        name_round = 1
+
+        # assign a fixed color+price to each special type
+        special_cfg = {}
+        for se in SPECIAL_ELEMENTS:
+            price = rng.choice(range(40, 101, 10))  # 40,50,…,100
+            color = "#{:06x}".format(rng.randint(0, 0xFFFFFF))
+            special_cfg[se] = {"price": price, "color": color, "group": None}
+
+        board.add_card("start", START)
+
+        # fill middle cards, leave room for the final "end" card
+        while len(board) < count - 1:
+            # a) make a contiguous block of size 2 or 3, never past the "end" card
+            block_size  = min(rng.choice([2, 3]), count - 1 - len(board))
+            block_color = "#{:06x}".format(rng.randint(0, 0xFFFFFF))
+            # draw unique names from the pool
+            block_names = []
+            for _ in range(block_size):
+                if not block_name_pool:
+                    # past the unique names a round number tells cards apart
+                    name_round += 1
+                    block_name_pool = [f"{name} {name_round}" for name in block_names_all]
+                    rng.shuffle(block_name_pool)
+                block_names.append(block_name_pool.pop())
+
+            # pick unique prices for this block (step of 5)
+            block_prices = rng.sample(range(20, 201, 5), len(block_names))
+
+            group = board.add_group(block_color)
+            for name, price in zip(block_names, block_prices):
+                board.add_card(name, BLOCK, price, group)
+
+            # stop if we’ve reached the limit
+            if len(board) >= count - 1:
+                break
+
+            # b) add one special card
+            se  = rng.choice(SPECIAL_ELEMENTS)
+            cfg = special_cfg[se]
+            if cfg["group"] is None:
+                cfg["group"] = board.add_group(cfg["color"])
+            board.add_card(se, SPECIAL, cfg["price"], cfg["group"])
+
+        board.add_card("end", END)
+
+        return board
+
+
+class _LazyColumn:
+    """read only view of one array of a LazyBoard"""
+
+    def __init__(self, board, column):
+        self.board = board
+        self.column = column
+
+    def __len__(self):
+        return len(self.board)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.board)
+        if not 0 <= index < len(self.board):
+            raise IndexError(index)
+        return self.board.chunk(index // CHUNK)[self.column][index % CHUNK]
+
+    def __iter__(self):
+        for index in range(len(self.board)):
+            yield self[index]
+
+
+class LazyBoard:
+    """board of any size generated on demand
+
+    Cards come in chunks of CHUNK cards, each chunk made of segments of a
+    block (2 or 3 cards) followed by a special, drawn from its own rng
+    seeded with (seed, chunk). Any card can be rebuilt without building
+    the ones before it, and only the last CHUNK_CACHE chunks are kept.
+    """
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.seed = seed
+        self._chunks = OrderedDict()
+
+        # specials share price and color across the whole board
+        rng = random.Random(f"{seed}:specials")
+        self._special_prices = [rng.choice(range(40, 101, 10)) for _ in SPECIAL_ELEMENTS]
+        self._special_colors = [parse_color("#{:06x}".format(rng.randint(0, 0xFFFFFF)))
+                                for _ in SPECIAL_ELEMENTS]
+        self._name_pool = [
+            f"{elem} {title}"
+            for elem in BLOCK_ELEMENTS
+            for title in BLOCK_TITLES
+        ]
+        self._strides = [n for n in range(1, len(self._name_pool)) if math.gcd(n, len(self._name_pool)) == 1]
+        self._block_prices = range(20, 201, 5)
+        # specials of each kind found so far, the chunks are scanned in order
+        # and only as far as a question needs
+        self._specials = [[] for _ in SPECIAL_ELEMENTS]
+        self._specials_scanned = 0
+
+        self.types = _LazyColumn(self, 0)
+        self.prices = _LazyColumn(self, 1)
+        self.groups = _LazyColumn(self, 2)
+
+    def __len__(self):
+        return self.size
+
+    def chunk(self, k):
+        """(types, prices, groups, names, colors) of chunk k, cached"""
+        cached = self._chunks.get(k)
+        if cached is not None:
+            self._chunks.move_to_end(k)
+            return cached
+        cached = self._build_chunk(k)
+        self._chunks[k] = cached
+        if len(self._chunks) > CHUNK_CACHE:
+            self._chunks.popitem(last=False)
+        return cached
+
+    def _build_chunk(self, k):
+        rng = random.Random(self.seed * 1_000_003 + k)
+        types, prices, groups, names, colors = (
+            array("B"), array("H"), array("l"), [], [])
+
+        # 24 cards = eight 3-card segments, or four 3-card and three 4-card, or six 4-card
+        long_segments = rng.choice([0, 3, 6])
+        segments = [4] * long_segments + [3] * ((CHUNK - 4 * long_segments) // 3)
+        rng.shuffle(segments)
+
+        # walking the name pool with a stride coprime to its size gives
+        # unique names without shuffling it
+        pool = self._name_pool
+        name_index = rng.randrange(len(pool))
+        stride = rng.choice(self._strides)
+        # past the unique names the chunk number tells cards apart
+        suffix = f" {k + 1}" if self.size > len(pool) else ""
+
+        for segment, segment_size in enumerate(segments):
+            group = len(SPECIAL_ELEMENTS) + k * 8 + segment
+            rgb = rng.getrandbits(24)
+            color = ((rgb >> 16) / 255, (rgb >> 8 & 0xFF) / 255, (rgb & 0xFF) / 255, 1.0)
+            # unique prices for this block (step of 5)
+            block_prices = rng.sample(self._block_prices, segment_size - 1)
+            for price in block_prices:
+                types.append(BLOCK)
+                prices.append(price)
+                groups.append(group)
+                names.append(pool[name_index] + suffix)
+                name_index = (name_index + stride) % len(pool)
+                colors.append(color)
+            special = rng.randrange(len(SPECIAL_ELEMENTS))
+            types.append(SPECIAL)
+            prices.append(self._special_prices[special])
+            groups.append(special)
+            names.append(SPECIAL_ELEMENTS[special])
+            colors.append(self._special_colors[special])
+
+        # start and end replace whatever was generated there
+        for index, type_code, name in ((0, START, "start"), (self.size - 1, END, "end")):
+            if index // CHUNK == k:
+                offset = index % CHUNK
+                types[offset] = type_code
+                prices[offset] = NO_PRICE
+                groups[offset] = NO_GROUP
+                names[offset] = name
+                colors[offset] = None
+
+        return types, prices, groups, names, colors
+
+    def _card_field(self, index, column):
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        return self.chunk(index // CHUNK)[column][index % CHUNK]
+
+    def name(self, index):
+        return self._card_field(index, 3)
+
+    def type_name(self, index):
+        return TYPE_NAMES[self._card_field(index, 0)]
+
+    def price(self, index):
+        """list price, None when the card is not for sale"""
+        return self._card_field(index, 1) or None
+
+    def color(self, index):
+        """RGBA of the card's group, None for start and end"""
+        return self._card_field(index, 4)
+
+    def _scan_specials(self, group, limit):
+        """scans chunks until limit specials of the group are found"""
+        found = self._specials[group]
+        chunks = (self.size + CHUNK - 1) // CHUNK
+        while len(found) < limit and self._specials_scanned < chunks:
+            k = self._specials_scanned
+            start = k * CHUNK
+            # built aside, the cache keeps the chunks the lanes show
+            types, _, groups, _, _ = self._build_chunk(k)
+            for offset, (type_code, special) in enumerate(zip(types, groups)):
+                if type_code == SPECIAL and start + offset < self.size:
+                    self._specials[special].append(start + offset)
+            self._specials_scanned += 1
+        return found
+
+    def count_in_group(self, group, limit):
+        """cards of a group, counted up to limit"""
+        if group < len(SPECIAL_ELEMENTS):
+            return min(len(self._scan_specials(group, limit)), limit)
+        return min(len(self.tiles_in_group(group)), limit)
+
+    def tiles_in_group(self, group):
+        """cards of a group, specials are spread over the whole board"""
+        if group < len(SPECIAL_ELEMENTS):
+            return list(self._scan_specials(group, self.size))
+        k = (group - len(SPECIAL_ELEMENTS)) // 8
+        start = k * CHUNK
+        return [start + offset for offset, value in enumerate(self.chunk(k)[2])
+                if value == group and start + offset < self.size]
+
+    def tiles_of_type(self, type_code):
+        """yields the cards of a type, chunk by chunk"""
+        for k in range((self.size + CHUNK - 1) // CHUNK):
+            start = k * CHUNK
+            for offset, value in enumerate(self.chunk(k)[0]):
+                if value == type_code and start + offset < self.size:
+                    yield start + offset
+
+    def card(self, index):
+        """the card as a dict, for logs and debugging"""
+        return {
+            "name": self.name(index),
+            "type": self.type_name(index),
+            "price": self.price(index),
+            "group": self.groups[index],
+        }
+
+
+def make_board(count, rng=random):
+    """a Board for normal sizes, a LazyBoard past LAZY_THRESHOLD cards"""
+    if count > LAZY_THRESHOLD:
+        return LazyBoard(count, seed=rng.getrandbits(64))
+    board = Board.generate(count, rng)
+    assert len(board) == count, f"{len(board)} cards generated for {count}"
+    return board
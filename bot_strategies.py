@@ -0,0 +1,125 @@
+"""bot strategies for the action card popup
+
+A strategy answers two questions: which popup option to pick when the
+bot lands on a card, and how much to bid when a card goes to auction.
+The same objects are used by the FSM, by game_rules.play_turn and by the
+tournament runner.
+
+A strategy draws from its own rng, never from the dice of the rules: the
+game's replay records its decisions and not how they were drawn.
+"""
+import random
+
+from game_rules import BUY, RENT, AUCTION, PASS, other_actor
+
+
+class Strategy:
+    """base strategy: buys what it can, bids nothing"""
+    name = "base"
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+
+    def decide(self, rules, state):
+        options = rules.options(state)
+        if RENT in options:
+            return RENT
+        return BUY if BUY in options else PASS
+
+    def bid(self, rules, state, actor):
+        return 0
+
+
+class GreedyStrategy(Strategy):
+    """buys everything it can afford, bids up to the full price"""
+    name = "greedy"
+
+    def bid(self, rules, state, actor):
+        price = state.board.prices[state.position()]
+        return min(price, state.inventories[actor]["money"] - 1)
+
+
+class CautiousStrategy(Strategy):
+    """keeps enough gold to survive the opponent's most expensive rent"""
+    name = "cautious"
+
+    def reserve(self, state, actor):
+        return 2 * state.ledger.top_rent(other_actor(actor)) + 10
+
+    def decide(self, rules, state):
+        options = rules.options(state)
+        if RENT in options:
+            return RENT
+        if BUY in options:
+            money_left = state.inventory()["money"] - rules.price(state)
+            if money_left >= self.reserve(state, state.actor):
+                return BUY
+        return PASS
+
+    def bid(self, rules, state, actor):
+        price = state.board.prices[state.position()]
+        money_left = state.inventories[actor]["money"] - self.reserve(state, actor)
+        return max(0, min(price // 2, money_left))
+
+
+class AuctioneerStrategy(Strategy):
+    """sends every free card to auction hoping to get it cheap"""
+    name = "auctioneer"
+
+    def decide(self, rules, state):
+        options = rules.options(state)
+        if RENT in options:
+            return RENT
+        return AUCTION if AUCTION in options else PASS
+
+    def bid(self, rules, state, actor):
+        price = state.board.prices[state.position()]
+        return min(price * 3 // 4, state.inventories[actor]["money"] - 1)
+
+
+class PassiveStrategy(Strategy):
+    """never buys anything, the baseline every bot should beat"""
+    name = "passive"
+
+    def decide(self, rules, state):
+        options = rules.options(state)
+        return RENT if RENT in options else PASS
+
+
+class RandomStrategy(Strategy):
+    """picks a random option from the strategy rng"""
+    name = "random"
+
+    def decide(self, rules, state):
+        return self.rng.choice(rules.options(state))
+
+    def bid(self, rules, state, actor):
+        money = state.inventories[actor]["money"]
+        return self.rng.randint(0, max(0, money - 1))
+
+
+class MctsStrategy(CautiousStrategy):
+    """monte carlo tree search within a time budget, see mcts_bot.py
+    bids like the cautious strategy"""
+    name = "mcts"
+    # seconds of search per decision
+    budget = 0.05
+
+    def decide(self, rules, state):
+        from mcts_bot import search
+        return search(rules, state, self.budget, seed=self.rng.random())
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (GreedyStrategy, CautiousStrategy, AuctioneerStrategy, PassiveStrategy, RandomStrategy,
+                     MctsStrategy)
+}
+
+
+def get_strategy(name, rng=None):
+    """returns a new strategy instance by name"""
+    try:
+        return STRATEGIES[name](rng)
+    except KeyError:
+        raise ValueError(f"unknown strategy {name!r}, pick one of {', '.join(STRATEGIES)}")
@@ -0,0 +1,113 @@
+"""dice atlas and roll animation
+
+The six Dice-N.png faces are packed once into a single atlas texture, 4
+faces per row and 2 rows, so every die shares one texture and showing a
+face only moves its texture offset. The atlas is built in memory, where
+panda does not round it to a power of two, so the cells are sized to
+keep it one.
+
+DiceAnimator flashes random faces and lands on the rolled ones. It owns a
+single task that is re-added on every roll, so rolling allocates no
+intervals and rebinds no textures.
+"""
+import random
+
+from panda3d.core import CardMaker, Filename, PNMImage, PythonTask, SamplerState, Texture, TextureStage
+
+FACES = 6
+COLUMNS = 4
+ROWS = 2
+# pixels of one face in the atlas, the source images are resized to it
+FACE_SIZE = 128
+# flashes of random faces before the rolled ones show
+FLASHES = 20
+# seconds from the first flash to the rolled faces
+ROLL_DURATION = 1.0
+
+
+def build_atlas(paths, face_size=FACE_SIZE):
+    """packs the face images, in face order, into one texture"""
+    atlas = PNMImage(COLUMNS * face_size, ROWS * face_size, 4)
+    atlas.fill(0, 0, 0)
+    atlas.alphaFill(0)
+    for face, path in enumerate(paths):
+        image = PNMImage(Filename(path))
+        if not image.hasAlpha():
+            image.addAlpha()
+            image.alphaFill(1)
+        if image.getXSize() != face_size or image.getYSize() != face_size:
+            resized = PNMImage(face_size, face_size, 4)
+            resized.quickFilterFrom(image)
+            image = resized
+        column, row = face % COLUMNS, face // COLUMNS
+        atlas.copySubImage(image, column * face_size, row * face_size)
+
+    texture = Texture("dice-atlas")
+    texture.load(atlas)
+    # no mipmaps, they would bleed the neighbouring faces in
+    texture.setMinfilter(SamplerState.FT_linear)
+    texture.setMagfilter(SamplerState.FT_linear)
+    texture.setWrapU(SamplerState.WM_clamp)
+    texture.setWrapV(SamplerState.WM_clamp)
+    return texture
+
+
+def face_offset(face):
+    """uv offset of a face (1-6), the image rows go top down"""
+    column, row = (face - 1) % COLUMNS, (face - 1) // COLUMNS
+    return column / COLUMNS, (ROWS - 1 - row) / ROWS
+
+
+class DiceAnimator:
+    """any number of dice sharing the atlas, one reusable roll task"""
+
+    def __init__(self, base, parent, atlas, positions, size=0.07, z=0.9,
+                 flashes=FLASHES, duration=ROLL_DURATION, rng=random):
+        self.base = base
+        self.flashes = flashes
+        self.duration = duration
+        self.rng = rng
+        self.stage = TextureStage.getDefault()
+
+        self.dice = []
+        for i, x in enumerate(positions):
+            cm = CardMaker(f"die{i+1}")
+            cm.setFrame(-size, size, -size, size)
+            node = parent.attachNewNode(cm.generate())
+            node.setPos(x, 0, z)
+            node.setTexture(atlas, 1)
+            node.setTexScale(self.stage, 1 / COLUMNS, 1 / ROWS)
+            self.dice.append(node)
+        # start with face “1”
+        self.show(*[1] * len(self.dice))
+
+        self.faces = None
+        self.on_done = None
+        self.flash = -1
+        self.task = PythonTask(self._animate, "diceRoll")
+
+    def show(self, *faces):
+        """faces (1-6) of the dice, in order"""
+        for node, face in zip(self.dice, faces):
+            node.setTexOffset(self.stage, *face_offset(face))
+
+    def roll(self, faces, on_done=None):
+        """flashes random faces, then shows faces and calls on_done"""
+        self.faces = faces
+        self.on_done = on_done
+        self.flash = -1
+        self.base.taskMgr.remove(self.task)
+        self.base.taskMgr.add(self.task)
+
+    def _animate(self, task):
+        if task.time >= self.duration or self.flashes == 0:
+            self.show(*self.faces)
+            if self.on_done:
+                self.on_done()
+            return task.done
+        flash = int(task.time * self.flashes / self.duration)
+        if flash != self.flash:
+            self.flash = flash
+            for node in self.dice:
+                node.setTexOffset(self.stage, *face_offset(self.rng.randint(1, FACES)))
+        return task.cont
@@ -0,0 +1,128 @@
+"""fair board search
+
+Board.generate draws prices and specials at random and never looks at the
+result. find_fair_board generates many seeded candidates across a process
+pool, scores each with the landing tables of markov.py and returns the
+fairest one, rebuilt from its seed.
+
+A candidate is scored on two things, lower is fairer:
+
+- imbalance: the expected rent income of each side. The human moves
+  first, so it tends to reach, and buy, each tile first; a tile is worth
+  its rent times the landings of the opponent on it.
+- traffic: how much of the price mass sits on tiles landed on more than
+  the average, expensive tiles on busy tiles decide games on their own.
+
+    python fair_board.py --size 20 --candidates 4096 --seed 7
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from board import Board, LAZY_THRESHOLD
+from game_rules import RENT_PERCENT
+from markov import MOVES, expected_visits, first_visits
+
+# weight of the traffic term against the income imbalance
+TRAFFIC_WEIGHT = 0.5
+# candidates scored by a worker per task
+CHUNK = 256
+
+
+def candidate_seed(base_seed, index):
+    """seed of a single candidate, stable across runs and worker counts"""
+    return base_seed * 1_000_003 + index
+
+
+def claim_chances(board_size, moves=MOVES):
+    """probability that the first and the second player land first on
+    each tile, the first player moves first on every turn"""
+    first = first_visits(board_size, moves)
+    # not reached in the first k moves
+    missed = 1 - np.cumsum(first, axis=0)
+    before = np.vstack([np.ones((1, board_size)), missed[:-1]])
+    # the first player's move k beats the second player's move k
+    return (first * before).sum(axis=0), (first * missed).sum(axis=0)
+
+
+def score_board(board, moves=MOVES):
+    """(score, details) of a board, see the module docstring"""
+    size = len(board)
+    prices = np.frombuffer(board.prices, dtype=np.uint16).astype(float)
+    visits = expected_visits(size, moves)
+    first, second = claim_chances(size, moves)
+
+    # rent of every tile times the landings of the opponent on it
+    rents = prices * RENT_PERCENT / 100 * visits
+    incomes = (float(rents @ first), float(rents @ second))
+    total = sum(incomes)
+    imbalance = abs(incomes[0] - incomes[1]) / total if total else 0
+
+    mass = prices.sum()
+    busy = visits > visits.mean()
+    traffic = float(prices[busy].sum() / mass) if mass else 0
+    # the share of busy tiles is what a price blind board would give
+    traffic_excess = max(0.0, traffic - busy.mean())
+
+    score = imbalance + TRAFFIC_WEIGHT * traffic_excess
+    return score, {"imbalance": imbalance, "traffic": traffic, "incomes": incomes}
+
+
+def score_chunk(task):
+    """worker entry point: the best (score, seed, details) of a seed range"""
+    start, stop, base_seed, board_size, moves = task
+    best = None
+    for index in range(start, stop):
+        seed = candidate_seed(base_seed, index)
+        score, details = score_board(Board.generate(board_size, random.Random(seed)), moves)
+        if best is None or score < best[0]:
+            best = (score, seed, details)
+    return best
+
+
+def find_fair_board(board_size, candidates=4096, base_seed=0, moves=MOVES, workers=None):
+    """the fairest of candidates boards, with its score details"""
+    if board_size > LAZY_THRESHOLD:
+        raise ValueError(f"fair boards are searched up to {LAZY_THRESHOLD} cards")
+    tasks = [(start, min(start + CHUNK, candidates), base_seed, board_size, moves)
+             for start in range(0, candidates, CHUNK)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers == 1 or sys.platform == "emscripten":
+        results = [score_chunk(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(score_chunk, tasks)
+
+    score, seed, details = min(results, key=lambda result: (result[0], result[1]))
+    details = dict(details, score=score, seed=seed)
+    return Board.generate(board_size, random.Random(seed)), details
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="search a fair board among seeded candidates")
+    parser.add_argument("--size", type=int, default=20)
+    parser.add_argument("--candidates", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--moves", type=int, default=MOVES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    board, details = find_fair_board(args.size, args.candidates, args.seed, args.moves, args.workers)
+    logging.info("%d candidates in %.2f s", args.candidates, time.perf_counter() - start)
+    logging.info("seed %d: score %.4f, imbalance %.4f, traffic %.3f, incomes %.1f / %.1f",
+                 details["seed"], details["score"], details["imbalance"], details["traffic"],
+                 *details["incomes"])
+    for index in range(len(board)):
+        print(board.card(index))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
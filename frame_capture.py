@@ -0,0 +1,207 @@
+"""frame times of a scripted game, with no display
+
+Runs the real game in an offscreen buffer (or with no window at all),
+plays SCRIPT, the keys a player presses through the title, the settings
+and a few turns, and records every frame:
+
+- cpu: from the start of the frame to the render, tasks, intervals and
+  the FSM
+- render: cull and draw, with gl-finish on it waits for the GPU too
+- frame: start to start of the next frame
+- nodes: under render and render2d
+
+    python frame_capture.py --out run.json
+    python frame_capture.py --out new.json --compare run.json
+    python frame_capture.py --display p3headlessgl     # GL with no X server
+
+The comparison exits with 1 when a percentile got more than --tolerance
+slower, or the scene grew.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+from panda3d.core import loadPrcFileData
+
+# seconds after the previous step, key sent
+SCRIPT = [
+    (1.0, "enter"),         # title, fades out
+    (4.0, "arrow_down"),    # settings: edit characters
+    (0.5, "enter"),
+    (1.0, "arrow_right"),   # characters page, pick the other box
+    (0.5, "enter"),         # back to the menu
+    (0.5, "arrow_down"),    # start game
+    (0.5, "enter"),
+] + [(2.5, "enter"), (3.0, "enter")] * 8   # roll, then pick on the popup
+# seconds recorded after the last step
+TAIL = 3.0
+# a percentile regressed when this much slower than the previous run
+TOLERANCE = 0.25
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class FrameRecorder:
+    """times every frame around igLoop, the task that renders it"""
+
+    # ShowBase renders in igLoop, sort 50
+    START_SORT = -100
+    RENDER_SORT = 49
+    END_SORT = 51
+
+    def __init__(self, base):
+        self.base = base
+        self.frames = []
+        self.frame_start = None
+        self.render_start = None
+        self.nodes = 0
+        base.taskMgr.add(self._start, "frameCaptureStart", sort=self.START_SORT)
+        base.taskMgr.add(self._before_render, "frameCaptureRender", sort=self.RENDER_SORT)
+        base.taskMgr.add(self._after_render, "frameCaptureEnd", sort=self.END_SORT)
+
+    def _start(self, task):
+        now = time.perf_counter()
+        if self.frame_start is not None and self.frames:
+            self.frames[-1]["frame"] = (now - self.frame_start) * 1e3
+        self.frame_start = now
+        return task.cont
+
+    def _before_render(self, task):
+        # counted out of both timings
+        self.nodes = self.base.render.countNumDescendants() + self.base.render2d.countNumDescendants()
+        self.render_start = time.perf_counter()
+        return task.cont
+
+    def _after_render(self, task):
+        end = time.perf_counter()
+        if self.frame_start is not None:
+            self.frames.append({
+                "cpu": (self.render_start - self.frame_start) * 1e3,
+                "render": (end - self.render_start) * 1e3,
+                "nodes": self.nodes,
+                "state": self.base.state,
+            })
+        return task.cont
+
+    def stop(self):
+        for name in ("frameCaptureStart", "frameCaptureRender", "frameCaptureEnd"):
+            self.base.taskMgr.remove(name)
+        # the last frame has no next one to end it
+        return [frame for frame in self.frames if "frame" in frame]
+
+
+class ScriptPlayer:
+    """sends the keys of a script as the game clock goes"""
+
+    def __init__(self, base, script, on_done, tail=TAIL):
+        self.base = base
+        self.script = list(script)
+        self.on_done = on_done
+        self.tail = tail
+        self.step = 0
+        self.next_at = self.script[0][0] if self.script else 0
+        base.taskMgr.add(self._play, "frameCaptureScript")
+
+    def _play(self, task):
+        while self.step < len(self.script) and task.time >= self.next_at:
+            key = self.script[self.step][1]
+            logging.info("script %.1f s: %s", task.time, key)
+            self.base.messenger.send(key)
+            self.step += 1
+            if self.step < len(self.script):
+                self.next_at += self.script[self.step][0]
+        if self.step == len(self.script) and task.time >= self.next_at + self.tail:
+            self.on_done()
+            return task.done
+        return task.cont
+
+
+def summarize(frames):
+    summary = {"frames": len(frames)}
+    for metric in ("frame", "cpu", "render", "nodes"):
+        values = [frame[metric] for frame in frames]
+        for p in PERCENTILES:
+            summary[f"{metric}.p{p}"] = percentile(values, p)
+        summary[f"{metric}.max"] = max(values, default=0)
+    return summary
+
+
+def compare(summary, previous, tolerance=TOLERANCE):
+    """one row per percentile, and whether any of them regressed"""
+    rows, regressed = [], False
+    for key, value in summary.items():
+        reference = previous.get(key)
+        if key == "frames" or key.endswith(".max") or not reference:
+            continue
+        ratio = value / reference
+        # node counts do not jitter, any growth counts
+        limit = 1 if key.startswith("nodes.") else 1 + tolerance
+        status = "ok"
+        if ratio > limit:
+            status, regressed = "WORSE", True
+        elif ratio < 1 - tolerance:
+            status = "better"
+        rows.append((key, value, reference, ratio, status))
+    return rows, regressed
+
+
+def capture(window_type="offscreen", display=None, script=SCRIPT):
+    """plays script in the real game, returns the recorded frames"""
+    # imported first, its prc data would override the window type
+    import main
+    loadPrcFileData("", f"""
+        window-type {window_type}
+        audio-library-name null
+        sync-video 0
+        gl-finish 1
+    """)
+    if display:
+        loadPrcFileData("", f"load-display {display}")
+
+    app = main.Monopoly2d()
+    recorder = FrameRecorder(app)
+    ScriptPlayer(app, script, app.taskMgr.stop)
+    app.run()
+    frames = recorder.stop()
+    app.destroy()
+    return frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="frame times of a scripted offscreen game")
+    parser.add_argument("--window-type", default="offscreen", choices=("offscreen", "none", "onscreen"))
+    parser.add_argument("--display", help="display module, e.g. p3headlessgl or p3tinydisplay")
+    parser.add_argument("--out", help="JSON file for the frames and their summary")
+    parser.add_argument("--compare", help="JSON file of a previous run")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    frames = capture(args.window_type, args.display)
+    summary = summarize(frames)
+    logging.info("%d frames, cpu p50 %.2f ms, render p50 %.2f ms, up to %d nodes",
+                 summary["frames"], summary["cpu.p50"], summary["render.p50"], summary["nodes.max"])
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"summary": summary, "frames": frames}, f)
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        previous = json.load(f)["summary"]
+    rows, regressed = compare(summary, previous, args.tolerance)
+    for key, value, reference, ratio, status in rows:
+        print(f"{key:12} {value:10.3f} {reference:10.3f} {ratio:6.2f}x  {status}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,364 @@
+"""headless game state and rules
+
+Everything the FSM in main.py needs to know about dice, movement, powers
+and losing lives here, with no Panda3D import, so that a turn can be
+played without opening a window.
+
+    python game_rules.py --turns 100000
+
+plays headless turns and prints the throughput.
+"""
+import argparse
+import logging
+import random
+import time
+
+from board import make_board
+from ledger import Ledger, NO_OWNER
+
+HUMAN = "human"
+BOT = "bot"
+ACTORS = (HUMAN, BOT)
+
+# options of the action card popup
+BUY = "buy"
+RENT = "rent"
+AUCTION = "auction"
+PASS = "pass"
+
+POWERS = ["cheaper_upgrades", "bonus"]
+STARTING_MONEY = 100
+# 10% discount
+POWER_CHEAPER_UPGRADES = 10
+# 30 $
+POWER_BONUS = 30
+# rent is this percentage of the property price
+RENT_PERCENT = 20
+# a game with no loser stops here and the richest player wins
+MAX_TURNS = 200
+
+def other_actor(actor):
+    """returns the actor playing after the given one"""
+    return BOT if actor == HUMAN else HUMAN
+
+
+def buy_price(price, power, cheaper_upgrades=POWER_CHEAPER_UPGRADES):
+    """price paid by a player with the given power"""
+    if power == "cheaper_upgrades":
+        return price - price * cheaper_upgrades // 100
+    return price
+
+
+def rent_for(price):
+    """rent owed when landing on an owned property, before the group bonus
+    of ledger.py"""
+    return price * RENT_PERCENT // 100
+
+
+class GameState:
+    """the whole state of a running game, without any rendering"""
+
+    def __init__(self, board, inventories, actor=HUMAN, turn=0, ledger=None):
+        # see board.py
+        self.board = board
+        self.board_size = len(board)
+        # who owns which card, see ledger.py
+        self.ledger = ledger if ledger is not None else Ledger(board, ACTORS, RENT_PERCENT)
+        # index on the board for each actor
+        self.positions = {HUMAN: 0, BOT: 0}
+        # {"power": ..., "money": ..., "cards": [{}]} for each actor
+        self.inventories = inventories
+        # which actor is in charge of action now
+        self.actor = actor
+        # tracks how many turns have passed
+        self.turn = turn
+        # last dice values
+        self.dice = (1, 1)
+        # actor that lost the game, None while the game runs
+        self.loser = None
+        # set when somebody lost or the turn limit was reached
+        self.finished = False
+        # records every change the rules make, see journal.py
+        self.journal = None
+        # records the decisions and keyframes of a replay, see replay.py
+        self.recorder = None
+
+    def copy(self):
+        """independent copy for simulations, the board is shared"""
+        state = GameState.__new__(GameState)
+        state.__dict__.update(self.__dict__)
+        state.ledger = self.ledger.copy()
+        # simulations are not part of the game history
+        state.journal = None
+        state.recorder = None
+        state.positions = dict(self.positions)
+        state.inventories = {actor: dict(inventory) for actor, inventory in self.inventories.items()}
+        return state
+
+    def inventory(self, actor=None):
+        return self.inventories[actor or self.actor]
+
+    def position(self, actor=None):
+        return self.positions[actor or self.actor]
+
+    @property
+    def over(self):
+        return self.finished
+
+    @property
+    def winner(self):
+        """the opponent of the loser, or the richest player, None on a tie"""
+        if self.loser:
+            return other_actor(self.loser)
+        human_gold = self.inventories[HUMAN]["money"]
+        bot_gold = self.inventories[BOT]["money"]
+        if human_gold == bot_gold:
+            return None
+        return HUMAN if human_gold > bot_gold else BOT
+
+
+class GameRules:
+    """pure python rules, driven by the FSM or by a headless loop"""
+
+    def __init__(self, board_size=20, power_bonus=POWER_BONUS,
+                 power_cheaper_upgrades=POWER_CHEAPER_UPGRADES,
+                 starting_money=STARTING_MONEY, max_turns=MAX_TURNS, rng=None,
+                 board_rng=None, inventory_rng=None):
+        self.board_size = board_size
+        self.power_bonus = power_bonus
+        self.power_cheaper_upgrades = power_cheaper_upgrades
+        self.starting_money = starting_money
+        self.max_turns = max_turns
+        # dice, the others default to it, replay.py gives each its own stream
+        self.rng = rng or random.Random()
+        self.board_rng = board_rng or self.rng
+        self.inventory_rng = inventory_rng or self.rng
+
+    def new_game(self, board=None):
+        """inventory is prepared with starting money and random powers
+        a new board is generated unless one is given"""
+        if board is None:
+            board = make_board(self.board_size, self.board_rng)
+
+        powers = list(POWERS)
+        human_power = self.inventory_rng.choice(powers)
+        powers.remove(human_power)
+        bot_power = powers[0]
+
+        inventories = {
+            HUMAN: {"power": human_power, "money": self.starting_money, "cards": [{}]},
+            BOT: {"power": bot_power, "money": self.starting_money, "cards": [{}]},
+        }
+        return GameState(board, inventories)
+
+    def start_turn(self, state):
+        """beginning of PlayGame: count the turn, check victory, then powers"""
+        state.turn += 1
+        if state.journal:
+            state.journal.turn(state)
+        self.check_victory(state)
+        return self.check_powers(state)
+
+    def check_victory(self, state):
+        """Victory is:
+            One of the players has no money and no properties
+            One of the players has completed a mission
+
+        returns the actor that lost, or None"""
+        for actor in ACTORS:
+            if state.inventories[actor].get("money", 0) <= 0:
+                state.loser = actor
+                state.finished = True
+                if state.journal:
+                    state.journal.loss(state)
+                return actor
+        return None
+
+    def check_turn_limit(self, state):
+        """past max_turns nobody went broke, the richest player wins"""
+        if not state.over and state.turn > self.max_turns:
+            state.finished = True
+            if state.journal:
+                state.journal.finish(state)
+        return state.over
+
+    def check_powers(self, state):
+        """applies the power of the current actor, returns the gold earned"""
+        inventory = state.inventory()
+        if inventory.get("power", "") == "bonus":
+            inventory["money"] = inventory.get("money", 0) + self.power_bonus
+            if state.journal:
+                state.journal.power(state, self.power_bonus)
+            return self.power_bonus
+        return 0
+
+    def roll_dice(self, state):
+        """2d6, stored on the state"""
+        state.dice = (self.rng.randint(1, 6), self.rng.randint(1, 6))
+        if state.journal:
+            state.journal.roll(state)
+        return state.dice
+
+    def move(self, state, delta):
+        """moves the current actor around the ring, returns (old, new) index"""
+        old_index = state.positions[state.actor]
+        new_index = (old_index + delta) % state.board_size
+        state.positions[state.actor] = new_index
+        if state.journal:
+            state.journal.move(state, old_index, new_index)
+        return old_index, new_index
+
+    def price(self, state, index=None):
+        """price the current actor would pay for a card, None if not for sale"""
+        price = state.board.price(state.position() if index is None else index)
+        if price is None:
+            return None
+        power = state.inventory().get("power", "")
+        return buy_price(price, power, self.power_cheaper_upgrades)
+
+    def for_sale(self, state):
+        """the card under the current actor has a price and no owner"""
+        index = state.position()
+        return state.board.prices[index] > 0 and state.ledger.owners[index] == NO_OWNER
+
+    def can_buy(self, state):
+        """the card under the current actor is free and affordable"""
+        return self.for_sale(state) and state.inventory()["money"] > self.price(state)
+
+    def options(self, state):
+        """popup options that make sense on the current card"""
+        if self.rent_due(state):
+            return [RENT]
+        if not self.for_sale(state):
+            return [PASS]
+        if self.can_buy(state):
+            return [BUY, AUCTION, PASS]
+        return [AUCTION, PASS]
+
+    def rent_due(self, state):
+        """rent the current actor owes for the card it stands on"""
+        index = state.position()
+        ledger = state.ledger
+        code = ledger.owners[index]
+        if code == NO_OWNER or ledger.actors[code] == state.actor:
+            return 0
+        return ledger.rent(index)
+
+    def attempt_buy(self, state):
+        """buys the card under the current actor, returns the price or 0"""
+        if not self.can_buy(state):
+            return 0
+        index = state.position()
+        price = self.price(state, index)
+        state.inventory()["money"] -= price
+        state.ledger.assign(index, state.actor)
+        if state.journal:
+            state.journal.buy(state, state.actor, index, price)
+        return price
+
+    def pay_rent(self, state):
+        """moves the rent from the current actor to the owner"""
+        rent = self.rent_due(state)
+        if rent:
+            state.inventory()["money"] -= rent
+            state.inventories[other_actor(state.actor)]["money"] += rent
+            if state.journal:
+                state.journal.rent(state, state.position(), rent)
+        return rent
+
+    def start_auction(self, state, bids):
+        """sells the current card to the highest affordable bid
+
+        bids maps actor -> amount, ties go to the current actor.
+        returns the winning actor or None"""
+        index = state.position()
+        if not self.for_sale(state):
+            return None
+        best_actor, best_bid = None, 0
+        for actor in (state.actor, other_actor(state.actor)):
+            bid = bids.get(actor, 0)
+            if bid > best_bid and state.inventories[actor]["money"] > bid:
+                best_actor, best_bid = actor, bid
+        if best_actor:
+            state.inventories[best_actor]["money"] -= best_bid
+            state.ledger.assign(index, best_actor)
+            if state.journal:
+                state.journal.buy(state, best_actor, index, best_bid)
+        return best_actor
+
+    def resolve(self, state, choice, bids=None):
+        """applies a popup option, rent is paid whatever was chosen"""
+        if state.recorder:
+            state.recorder.decision(state, choice, bids)
+        if self.rent_due(state):
+            return self.pay_rent(state)
+        if choice == BUY:
+            return self.attempt_buy(state)
+        if choice == AUCTION:
+            return self.start_auction(state, bids or {})
+        return None
+
+    def end_turn(self, state):
+        """switch actor"""
+        if state.journal:
+            state.journal.end_turn(state)
+        state.actor = other_actor(state.actor)
+        if state.recorder:
+            state.recorder.turn_done(state, self)
+
+    def advance(self, state):
+        """PlayGame -> RollDice -> MovePlayer of a headless turn,
+        returns False when the game is over instead"""
+        self.start_turn(state)
+        self.check_turn_limit(state)
+        if state.over:
+            return False
+        d1, d2 = self.roll_dice(state)
+        self.move(state, d1 + d2)
+        return True
+
+    def play_turn(self, state, strategies=None):
+        """a whole turn with no animation: PlayGame -> RollDice -> MovePlayer
+
+        strategies maps actor -> strategy (see bot_strategies.py) taking the
+        popup decision, by default the actor buys whatever it can afford"""
+        if self.advance(state):
+            self.settle(state, strategies)
+        return state
+
+    def settle(self, state, strategies=None):
+        """popup decision of the actor that just moved, then switch actor"""
+        if strategies:
+            choice = strategies[state.actor].decide(self, state)
+            bids = None
+            if choice == AUCTION:
+                bids = {actor: strategy.bid(self, state, actor) for actor, strategy in strategies.items()}
+            self.resolve(state, choice, bids)
+        else:
+            self.resolve(state, BUY)
+        self.end_turn(state)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="play headless turns")
+    parser.add_argument("--turns", type=int, default=100000)
+    parser.add_argument("--board-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    rules = GameRules(board_size=args.board_size, rng=random.Random(args.seed))
+    state = rules.new_game()
+
+    start = time.perf_counter()
+    for _ in range(args.turns):
+        if state.over:
+            state = rules.new_game()
+        rules.play_turn(state)
+    elapsed = time.perf_counter() - start
+
+    logging.info("%d turns in %.3f s (%.0f turns/s)", args.turns, elapsed, args.turns / elapsed)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,113 @@
+"""timing of FSM states, popups and intervals
+
+The Tracer keeps the last RING_SIZE timed events in a ring buffer and
+writes them as Chrome trace JSON, which chrome://tracing and Perfetto
+open as a timeline:
+
+    TRACE=trace.json python main.py
+
+dumps the trace on exit, F9 dumps it at any time. Nothing is printed, the
+buffer costs the same whether the trace is written or not.
+
+instrument_fsm wraps the enter and exit methods of an FSM on the
+instance, so every state gets two kinds of events: the time its
+enter/exit method took, and the time the game stayed in the state until
+the next one was entered, which is where a turn's latency goes.
+"""
+from collections import deque
+import json
+import logging
+import os
+import re
+import time
+
+from direct.interval.IntervalGlobal import Func, Sequence
+
+# path the trace is written to on exit, no trace file when unset
+TRACE = os.environ.get("TRACE")
+# events kept, the oldest ones are dropped first
+RING_SIZE = int(os.environ.get("TRACE_RING_SIZE", "20000"))
+
+FSM_METHOD = re.compile(r"(enter|exit)([A-Z]\w*)$")
+
+
+class Tracer:
+    """ring buffer of timed events, see the module docstring"""
+
+    def __init__(self, size=RING_SIZE, clock=time.perf_counter):
+        self.clock = clock
+        self.origin = clock()
+        self.events = deque(maxlen=size)
+        # (category, name) -> start of the spans still open
+        self.open = {}
+        # state the FSM is in, and since when
+        self.state = None
+        self.state_start = 0
+
+    def now(self):
+        """microseconds since the tracer was made, the trace time unit"""
+        return (self.clock() - self.origin) * 1e6
+
+    def complete(self, category, name, start, end, args=None):
+        event = {"name": name, "cat": category, "ph": "X", "ts": start, "dur": end - start,
+                 "pid": 1, "tid": 1}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def instant(self, category, name, args=None):
+        event = {"name": name, "cat": category, "ph": "i", "ts": self.now(), "s": "g",
+                 "pid": 1, "tid": 1}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def begin(self, category, name):
+        self.open[(category, name)] = self.now()
+
+    def end(self, category, name, args=None):
+        start = self.open.pop((category, name), None)
+        if start is not None:
+            self.complete(category, name, start, self.now(), args)
+
+    def interval(self, name, *intervals):
+        """a Sequence playing intervals, timed as one span"""
+        return Sequence(Func(self.begin, "interval", name), *intervals, Func(self.end, "interval", name))
+
+    def instrument_fsm(self, fsm):
+        """times every enterX/exitX of fsm, wrapped on the instance"""
+        for attribute in dir(type(fsm)):
+            match = FSM_METHOD.match(attribute)
+            method = getattr(fsm, attribute, None)
+            if match and callable(method):
+                setattr(fsm, attribute, self._wrap_fsm_method(method, attribute, match.group(1), match.group(2)))
+
+    def _wrap_fsm_method(self, method, attribute, kind, state):
+        def timed(*args, **kwargs):
+            start = self.now()
+            if kind == "enter":
+                self._enter_state(state, start)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.complete("fsm", attribute, start, self.now())
+        return timed
+
+    def _enter_state(self, state, now):
+        # the game states do not always exit (the bot turn calls
+        # enterPlayGame directly), a state lasts until the next one
+        if self.state is not None:
+            self.complete("state", self.state, self.state_start, now)
+        self.state, self.state_start = state, now
+
+    def trace(self):
+        """the buffer as a Chrome trace dict"""
+        return {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+    def dump(self, path=None):
+        """writes the trace as JSON, returns the path"""
+        path = path or TRACE or "trace.json"
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
+        logging.info("trace of %d events written to %s", len(self.events), path)
+        return path
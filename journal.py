@@ -0,0 +1,287 @@
+"""append-only journal of the game
+
+Every state change the rules make is recorded as a fixed size binary
+event: new game, seed, turn, roll, move, buy, rent, power income, loss,
+end of the game and end of turn, 14 bytes each, about 12 kB for a game of
+200 turns.
+
+Recording only appends to a buffer in memory; a background thread writes
+the buffer in batches and fsyncs it, so the render task never touches the
+disk and a crash loses at most FLUSH_INTERVAL seconds. The browser build
+has no threads and writes a batch inline once it is full.
+
+A file can be read back with read_events, a torn last event is dropped,
+and replay rebuilds the GameState from the events. A new game records its
+board size, fair board candidates and seed, from which the board is dealt
+again (see replay.new_game). A game attached mid play, a loaded save or
+a replay seek, also records the positions and purchases it already has
+and needs its board passed to replay. A file written by another VERSION
+is refused instead of appended to:
+
+    JOURNAL=game.journal python main.py
+    python journal.py game.journal
+"""
+import argparse
+import logging
+import os
+import struct
+import sys
+import threading
+
+from game_rules import ACTORS, POWERS, GameRules, GameState, other_actor
+from replay import new_game
+
+MAGIC = b"MJNL"
+VERSION = 2
+# kind, actor, turn, two values
+EVENT = struct.Struct("<BBIii")
+# a game seed fits in the two values of a SEED event
+SEED_BITS = struct.Struct("<Q")
+SEED_HALVES = struct.Struct("<ii")
+
+NEW_GAME = 0
+START = 1
+TURN = 2
+ROLL = 3
+MOVE = 4
+BUY = 5
+RENT = 6
+POWER = 7
+LOSS = 8
+FINISH = 9
+END_TURN = 10
+SEED = 11
+KIND_NAMES = ("new_game", "start", "turn", "roll", "move", "buy", "rent", "power", "loss", "finish", "end_turn",
+              "seed")
+
+# seconds between two writes of the background thread
+FLUSH_INTERVAL = float(os.environ.get("JOURNAL_FLUSH_INTERVAL", "0.5"))
+# events buffered before the browser build writes them inline
+BATCH_EVENTS = 256
+
+ACTOR_CODES = {actor: code for code, actor in enumerate(ACTORS)}
+POWER_CODES = {power: code for code, power in enumerate(POWERS)}
+
+
+class Journal:
+    """buffered binary event log of one file, see the module docstring"""
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, threaded=sys.platform != "emscripten"):
+        self.path = path
+        self.flush_interval = flush_interval
+        # appends whatever the position, reads the header of an existing file
+        self.file = open(path, "a+b")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC + bytes([VERSION]))
+        else:
+            self.file.seek(0)
+            try:
+                check_header(self.file.read(len(MAGIC) + 1), path)
+            except ValueError:
+                self.file.close()
+                raise
+        self.buffer = bytearray()
+        self.lock = threading.Lock()
+        self.events = 0
+        self.stopping = threading.Event()
+        self.thread = None
+        if threaded:
+            self.thread = threading.Thread(target=self._flush_loop, name="journal", daemon=True)
+            self.thread.start()
+
+    def record(self, kind, actor, turn, a=0, b=0):
+        with self.lock:
+            self.buffer += EVENT.pack(kind, ACTOR_CODES[actor], turn, a, b)
+            self.events += 1
+        if self.thread is None and len(self.buffer) >= BATCH_EVENTS * EVENT.size:
+            self.flush()
+
+    # one method per event, called by the rules
+    def new_game(self, state, game_seed=None, fair_candidates=0):
+        """the board size and fair board candidates, the seed when known,
+        then the gold and power of every actor"""
+        self.record(NEW_GAME, state.actor, state.turn, state.board_size, fair_candidates)
+        if game_seed is not None:
+            # two signed halves of the 64 bit seed
+            self.record(SEED, state.actor, state.turn, *SEED_HALVES.unpack(SEED_BITS.pack(game_seed)))
+        for actor in ACTORS:
+            inventory = state.inventories[actor]
+            self.record(START, actor, state.turn, inventory["money"], POWER_CODES.get(inventory.get("power"), -1))
+
+    def resume(self, state):
+        """what a game attached mid play already has: positions, the last
+        roll and the purchases, free of charge since START holds the gold"""
+        for actor in ACTORS:
+            position = state.positions[actor]
+            if position:
+                self.record(MOVE, actor, state.turn, position, position)
+        if state.turn:
+            self.roll(state)
+        ledger = state.ledger
+        for index in ledger.bought:
+            self.buy(state, ledger.actors[ledger.owners[index]], index, 0)
+        if state.loser:
+            self.loss(state)
+        elif state.finished:
+            self.finish(state)
+
+    def turn(self, state):
+        self.record(TURN, state.actor, state.turn)
+
+    def roll(self, state):
+        self.record(ROLL, state.actor, state.turn, *state.dice)
+
+    def move(self, state, old_index, new_index):
+        self.record(MOVE, state.actor, state.turn, old_index, new_index)
+
+    def buy(self, state, actor, index, price):
+        self.record(BUY, actor, state.turn, index, price)
+
+    def rent(self, state, index, rent):
+        self.record(RENT, state.actor, state.turn, index, rent)
+
+    def power(self, state, amount):
+        self.record(POWER, state.actor, state.turn, amount)
+
+    def loss(self, state):
+        self.record(LOSS, state.loser, state.turn)
+
+    def finish(self, state):
+        self.record(FINISH, state.actor, state.turn)
+
+    def end_turn(self, state):
+        self.record(END_TURN, state.actor, state.turn)
+
+    def attach(self, state, game_seed=None, fair_candidates=0):
+        """records the start of a game and everything the rules do to it,
+        a loaded or replayed game from where it stands"""
+        state.journal = self
+        self.new_game(state, game_seed, fair_candidates)
+        self.resume(state)
+
+    def flush(self):
+        """writes the buffered events and fsyncs them"""
+        with self.lock:
+            data, self.buffer = self.buffer, bytearray()
+        if data:
+            self.file.write(data)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def _flush_loop(self):
+        while not self.stopping.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        if self.thread is not None:
+            self.stopping.set()
+            self.thread.join()
+        self.flush()
+        self.file.close()
+
+
+def check_header(data, path):
+    """ValueError unless data starts a journal of this VERSION"""
+    if len(data) <= len(MAGIC) or data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a journal")
+    if data[len(MAGIC)] != VERSION:
+        raise ValueError(f"{path} is journal version {data[len(MAGIC)]}, not {VERSION}")
+
+
+def read_events(path):
+    """(kind, actor, turn, a, b) of every complete event in the file"""
+    with open(path, "rb") as f:
+        data = f.read()
+    header = len(MAGIC) + 1
+    check_header(data, path)
+    # a crash can leave half an event at the end
+    end = header + (len(data) - header) // EVENT.size * EVENT.size
+    for kind, actor, turn, a, b in EVENT.iter_unpack(memoryview(data)[header:end]):
+        yield kind, ACTORS[actor], turn, a, b
+
+
+def games(events):
+    """splits the events into one list per game"""
+    game = None
+    for event in events:
+        if event[0] == NEW_GAME:
+            if game:
+                yield game
+            game = []
+        if game is not None:
+            game.append(event)
+    if game:
+        yield game
+
+
+def deal_board(events):
+    """the board of one game dealt again from its seed, None without one"""
+    board_size = fair_candidates = None
+    for kind, actor, turn, a, b in events:
+        if kind == NEW_GAME:
+            board_size, fair_candidates = a, b
+        elif kind == SEED:
+            game_seed = SEED_BITS.unpack(SEED_HALVES.pack(a, b))[0]
+            return new_game(GameRules(board_size=board_size), game_seed, fair_candidates).board
+        elif kind != START:
+            break
+    return None
+
+
+def replay(events, board=None):
+    """the GameState after the events of one game, played on board or on
+    the board dealt again from the recorded seed"""
+    if board is None:
+        board = deal_board(events)
+        if board is None:
+            raise ValueError("the game was journaled without its seed, pass its board")
+    inventories = {actor: {"power": None, "money": 0, "cards": [{}]} for actor in ACTORS}
+    state = GameState(board, inventories)
+    for kind, actor, turn, a, b in events:
+        state.turn = turn
+        if kind == NEW_GAME:
+            if a != state.board_size:
+                raise ValueError(f"journal of a {a} card board, replayed on {state.board_size}")
+            state.actor = actor
+        elif kind == START:
+            inventories[actor]["money"] = a
+            inventories[actor]["power"] = POWERS[b] if b >= 0 else None
+        elif kind == TURN:
+            state.actor = actor
+        elif kind == ROLL:
+            state.dice = (a, b)
+        elif kind == MOVE:
+            state.positions[actor] = b
+        elif kind == BUY:
+            inventories[actor]["money"] -= b
+            state.ledger.assign(a, actor)
+        elif kind == RENT:
+            inventories[actor]["money"] -= b
+            inventories[other_actor(actor)]["money"] += b
+        elif kind == POWER:
+            inventories[actor]["money"] += a
+        elif kind == LOSS:
+            state.loser = actor
+            state.finished = True
+        elif kind == FINISH:
+            state.finished = True
+        elif kind == END_TURN:
+            state.actor = other_actor(actor)
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="print the events of a journal")
+    parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    count = 0
+    for kind, actor, turn, a, b in read_events(args.path):
+        print(f"{turn:>5} {actor:<6} {KIND_NAMES[kind]:<9} {a:>6} {b:>6}")
+        count += 1
+    logging.info("%d events", count)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
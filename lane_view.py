@@ -0,0 +1,268 @@
+"""virtualized lane of cards
+
+A lane used to hold one card node and one text node per card of the
+board, even though the scissor only lets a handful of them show. A
+LaneView keeps a small pool of card nodes around the viewport instead and
+rebinds them to other cards as the lane scrolls, so the scene graph and
+the build time stay the same whatever the board size.
+
+Card i always lives in slot i % pool_size, so finding the node of a card
+is one lookup, and the view remembers the highlighted card so a move only
+rescales the old and the new one.
+
+BatchedLaneView draws the same lane with one Geom for all the card
+backgrounds, colored through a vertex column, and one flattened node for
+all the labels, whose glyphs come from the single page of the shared font.
+That is two draw calls per lane instead of two per card.
+"""
+import math
+
+from panda3d.core import (
+    CardMaker, LPoint3f, TextNode, DynamicTextFont, Geom, GeomNode, GeomTriangles,
+    GeomVertexData, GeomVertexFormat, GeomVertexWriter
+)
+from direct.gui.OnscreenText import OnscreenText
+
+# cards kept bound on each side of the visible slots
+MARGIN = 2
+# scale of the selected card
+HIGHLIGHT_SCALE = 1.2
+# glyph page of the shared font, big enough to hold every label glyph
+FONT_PAGE_SIZE = 512
+
+
+class LaneView:
+    def __init__(self, lane, content_name, board, prefix, x_origin, color_for,
+                 visible_slots=2, card_height=1, margin=MARGIN, texture=None):
+        """
+        lane: NodePath clipped by the scissor, the content scrolls inside it
+        board: Board or LazyBoard drawn in the lane
+        prefix: "L" or "R", bound cards are named prefix + card index
+        x_origin: left edge of the first card in content coordinates
+        color_for: callback card index -> LColor
+        texture: card face tinted by the card color, the lane background
+            shows through the cards when None
+        """
+        self.board = board
+        self.prefix = prefix
+        self.x_origin = x_origin
+        self.color_for = color_for
+        self.visible_slots = visible_slots
+        self.card_height = card_height
+        self.margin = margin
+        # compute the slot width so exactly visible_slots fill –1→+1
+        self.width = 2.0 / visible_slots
+
+        # each lane gets a “content” NodePath under which the pool lives
+        self.content = lane.attachNewNode(content_name)
+        if texture is not None:
+            self.content.setTexture(texture)
+        self.scroll = 0.0
+
+        self.pool_size = visible_slots + 2 * margin + 1
+        # card index bound to each pool slot
+        self.bound = [None] * self.pool_size
+        # selected card, it keeps its scale when its slot is rebound
+        self.highlighted = None
+        self._build_pool()
+
+        self.set_scroll(0)
+
+    def _build_pool(self):
+        """one card node with its own text node per slot"""
+        width, card_height = self.width, self.card_height
+        self.cards = []
+        self.labels = []
+        for slot in range(self.pool_size):
+            cm = CardMaker(f"{self.prefix}slot{slot}")
+            cm.setFrame(-width/2, +width/2, -card_height/2, +card_height/2)
+            node = self.content.attachNewNode(cm.generate())
+            node.setZ(0.1)
+            label = OnscreenText(
+                text="",
+                pos=(0, card_height/2 - 0.1),  # Positioning above the rectangle
+                scale=0.1,
+                fg=(1, 1, 1, 1),  # White text
+                parent=node,  # Attach to the rectangle
+                align=TextNode.ACenter
+            )
+            node.hide()
+            self.cards.append(node)
+            self.labels.append(label)
+
+    def card_x(self, index):
+        return self.x_origin + self.width/2 + index*self.width
+
+    def card_pos(self, index):
+        """position of a card in content coordinates, bound or not"""
+        return LPoint3f(self.card_x(index), 0, 0.1)
+
+    def start_for(self, index):
+        """first visible slot when index is selected, clamped at the edges"""
+        half = self.visible_slots // 2
+        return min(max(index - half, 0), len(self.board) - self.visible_slots)
+
+    def set_scroll(self, scroll):
+        """scrolls the content to a (fractional) slot, rebinding the pool"""
+        self.scroll = scroll
+        self.content.setX(-scroll * self.width)
+        first = int(math.floor(scroll)) - self.margin
+        for index in range(first, first + self.pool_size):
+            self._bind(index)
+
+    def scroll_to(self, index):
+        self.set_scroll(self.start_for(index))
+
+    def set_board(self, board):
+        """shows another board in the same pool, back at the first card"""
+        self.board = board
+        self.bound = [None] * self.pool_size
+        self.highlighted = None
+        self.set_scroll(0)
+
+    def slot_of(self, index):
+        """pool slot showing a card, None when the card is not bound"""
+        slot = index % self.pool_size
+        return slot if self.bound[slot] == index else None
+
+    def card(self, index):
+        """node of a card, None when the card is not bound"""
+        slot = self.slot_of(index)
+        return None if slot is None else self.cards[slot]
+
+    def _bind(self, index):
+        slot = index % self.pool_size
+        if self.bound[slot] == index:
+            return
+        self.bound[slot] = index
+        if 0 <= index < len(self.board):
+            self._show_card(slot, index)
+        else:
+            self._hide_card(slot)
+
+    def _show_card(self, slot, index):
+        node = self.cards[slot]
+        node.setName(f"{self.prefix}{index}")
+        node.setX(self.card_x(index))
+        scale = HIGHLIGHT_SCALE if index == self.highlighted else 1
+        node.setScale(scale, 1, scale)
+        node.setColor(self.color_for(index))
+        self.labels[slot].setText(self.board.name(index))
+        node.show()
+
+    def _hide_card(self, slot):
+        self.cards[slot].hide()
+
+    def _scale_card(self, slot, scale):
+        self.cards[slot].setScale(scale, 1, scale)
+
+    def highlight(self, index):
+        """the selected card grows, only the old and new card are touched"""
+        if index == self.highlighted:
+            return
+        previous, self.highlighted = self.highlighted, index
+        if previous is not None:
+            slot = self.slot_of(previous)
+            if slot is not None:
+                self._scale_card(slot, 1)
+        slot = self.slot_of(index)
+        if slot is not None:
+            self._scale_card(slot, HIGHLIGHT_SCALE)
+
+
+class BatchedLaneView(LaneView):
+    """same lane in two draw calls, see the module docstring"""
+
+    def _build_pool(self):
+        # the font keeps its glyphs in pages, one big page is one texture
+        self.font = TextNode.getDefaultFont()
+        if isinstance(self.font, DynamicTextFont):
+            self.font.setPageSize(FONT_PAGE_SIZE, FONT_PAGE_SIZE)
+        self.text = TextNode(f"{self.prefix}-label")
+        self.text.setFont(self.font)
+        self.text.setAlign(TextNode.ACenter)
+        self.text.setTextColor(1, 1, 1, 1)
+
+        # four vertices per slot, texcoords like CardMaker so the lane
+        # background texture shades them the same way
+        vdata = GeomVertexData(f"{self.prefix}-cards", GeomVertexFormat.getV3c4t2(), Geom.UHDynamic)
+        vdata.setNumRows(self.pool_size * 4)
+        texcoord = GeomVertexWriter(vdata, "texcoord")
+        tris = GeomTriangles(Geom.UHStatic)
+        for slot in range(self.pool_size):
+            for uv in ((0, 0), (1, 0), (1, 1), (0, 1)):
+                texcoord.addData2f(*uv)
+            base = slot * 4
+            tris.addVertices(base, base + 1, base + 2)
+            tris.addVertices(base, base + 2, base + 3)
+        self.geom = Geom(vdata)
+        self.geom.addPrimitive(tris)
+        node = GeomNode(f"{self.prefix}-cards")
+        node.addGeom(self.geom)
+        self.cards_np = self.content.attachNewNode(node)
+
+        self.labels_np = self.content.attachNewNode(f"{self.prefix}-labels")
+        self.scales = [1] * self.pool_size
+        self.labels_dirty = False
+        for slot in range(self.pool_size):
+            self._hide_card(slot)
+
+    def _write_quad(self, slot, x, scale, color):
+        vdata = self.geom.modifyVertexData()
+        vertex = GeomVertexWriter(vdata, "vertex")
+        colors = GeomVertexWriter(vdata, "color")
+        vertex.setRow(slot * 4)
+        colors.setRow(slot * 4)
+        half_w = self.width / 2 * scale
+        half_h = self.card_height / 2 * scale
+        for dx, dz in ((-half_w, -half_h), (half_w, -half_h), (half_w, half_h), (-half_w, half_h)):
+            vertex.setData3f(x + dx, 0, 0.1 + dz)
+            colors.setData4f(color)
+
+    def card(self, index):
+        """cards have no node of their own here, see slot_of"""
+        return None
+
+    def _show_card(self, slot, index):
+        scale = HIGHLIGHT_SCALE if index == self.highlighted else 1
+        self.scales[slot] = scale
+        self._write_quad(slot, self.card_x(index), scale, self.color_for(index))
+        self.labels_dirty = True
+
+    def _hide_card(self, slot):
+        # a zero area quad draws nothing
+        self._write_quad(slot, 0, 0, (0, 0, 0, 0))
+        self.labels_dirty = True
+
+    def _scale_card(self, slot, scale):
+        index = self.bound[slot]
+        if self.scales[slot] == scale or index is None or not 0 <= index < len(self.board):
+            return
+        self.scales[slot] = scale
+        self._write_quad(slot, self.card_x(index), scale, self.color_for(index))
+        self.labels_dirty = True
+
+    def _rebuild_labels(self):
+        """regenerates the labels of the bound cards into a single node"""
+        self.labels_np.node().removeAllChildren()
+        for slot, index in enumerate(self.bound):
+            if index is None or not 0 <= index < len(self.board):
+                continue
+            scale = self.scales[slot]
+            self.text.setText(self.board.name(index))
+            label = self.labels_np.attachNewNode(self.text.generate())
+            # same place as the OnscreenText of a card node
+            label.setPos(self.card_x(index), 0, 0.1 + (self.card_height/2 - 0.1) * scale)
+            label.setScale(0.1 * scale)
+        self.labels_np.flattenStrong()
+        self.labels_dirty = False
+
+    def set_scroll(self, scroll):
+        super().set_scroll(scroll)
+        if self.labels_dirty:
+            self._rebuild_labels()
+
+    def highlight(self, index):
+        super().highlight(index)
+        if self.labels_dirty:
+            self._rebuild_labels()
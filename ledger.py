@@ -0,0 +1,114 @@
+"""ownership ledger
+
+Who owns what, kept so that every question the rules and the bots ask is
+answered without scanning the board:
+
+- owners: actor code of each tile, NO_OWNER when nobody bought it
+- holdings: the set of tiles of each actor, as small as what it bought
+- group_counts: tiles of each color group owned by each actor, a group is
+  complete when the board has no more tiles in it than the count, which a
+  LazyBoard answers without scanning past count + 1 of them
+- worths and top_rents: price of the holdings of each actor and the
+  highest rent they charge, kept up to date on every purchase
+- bought: the tiles in the order they were bought, see snapshots.py
+
+Rent is rent_percent of the price, times GROUP_RENT_BONUS when the owner
+holds the whole group. Tiles are never sold back, so a purchase is the only
+update.
+"""
+from array import array
+
+NO_OWNER = -1
+# rent multiplier of a tile whose owner holds its whole group
+GROUP_RENT_BONUS = 2
+
+
+class Ledger:
+    """tile owners of one game, see the module docstring"""
+
+    def __init__(self, board, actors, rent_percent):
+        self.board = board
+        self.actors = tuple(actors)
+        self.codes = {actor: code for code, actor in enumerate(self.actors)}
+        self.rent_percent = rent_percent
+        self.owners = array("b", [NO_OWNER]) * len(board)
+        self.holdings = [set() for _ in self.actors]
+        self.group_counts = [{} for _ in self.actors]
+        self.worths = [0] * len(self.actors)
+        self.top_rents = [0] * len(self.actors)
+        self.bought = []
+
+    def copy(self):
+        """independent copy for simulations, the board is shared"""
+        ledger = Ledger.__new__(Ledger)
+        ledger.__dict__.update(self.__dict__)
+        ledger.owners = array("b", self.owners)
+        ledger.holdings = [set(tiles) for tiles in self.holdings]
+        ledger.group_counts = [dict(counts) for counts in self.group_counts]
+        ledger.worths = list(self.worths)
+        ledger.top_rents = list(self.top_rents)
+        ledger.bought = list(self.bought)
+        return ledger
+
+    def owner(self, index):
+        """actor owning the tile, None when nobody bought it"""
+        code = self.owners[index]
+        return None if code == NO_OWNER else self.actors[code]
+
+    def owns(self, actor, index):
+        return self.owners[index] == self.codes[actor]
+
+    def count(self, actor):
+        """tiles the actor owns"""
+        return len(self.holdings[self.codes[actor]])
+
+    def worth(self, actor):
+        """list price of everything the actor owns"""
+        return self.worths[self.codes[actor]]
+
+    def top_rent(self, actor):
+        """highest rent the actor charges, 0 when it owns nothing"""
+        return self.top_rents[self.codes[actor]]
+
+    def tiles_of(self, actor):
+        """indexes of the tiles the actor owns, in board order"""
+        return iter(sorted(self.holdings[self.codes[actor]]))
+
+    def _complete(self, code, group):
+        count = self.group_counts[code].get(group, 0)
+        return count > 0 and self.board.count_in_group(group, count + 1) == count
+
+    def group_complete(self, actor, group):
+        """the actor owns every tile of the group"""
+        return self._complete(self.codes[actor], group)
+
+    def base_rent(self, index):
+        return self.board.prices[index] * self.rent_percent // 100
+
+    def rent(self, index):
+        """rent charged on the tile, 0 when nobody owns it"""
+        code = self.owners[index]
+        if code == NO_OWNER:
+            return 0
+        rent = self.base_rent(index)
+        if self._complete(code, self.board.groups[index]):
+            rent *= GROUP_RENT_BONUS
+        return rent
+
+    def assign(self, index, actor):
+        """records a purchase, the tile must be free"""
+        code = self.codes[actor]
+        self.owners[index] = code
+        self.holdings[code].add(index)
+        self.worths[code] += self.board.prices[index]
+        self.bought.append(index)
+
+        group = self.board.groups[index]
+        counts = self.group_counts[code]
+        counts[group] = counts.get(group, 0) + 1
+        if self._complete(code, group):
+            # the whole group now charges the bonus
+            top = max(self.base_rent(tile) for tile in self.board.tiles_in_group(group)) * GROUP_RENT_BONUS
+        else:
+            top = self.base_rent(index)
+        self.top_rents[code] = max(self.top_rents[code], top)
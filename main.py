@@ -8,6 +8,7 @@ import sys
 import random
 import logging
 import asyncio
+import atexit
 import os
 from panda3d.core import CardMaker, ScissorAttrib, TextNode, LColor, TexGenAttrib, TextureStage, loadPrcFileData, LPoint3f
 from direct.gui.OnscreenText import OnscreenText
@@ -16,13 +17,64 @@ from direct.gui.DirectGui import (
 )
 from direct.showbase.ShowBase import ShowBase
 from direct.task import Task
-from direct.interval.IntervalGlobal import Sequence, Wait, Func, LerpPosInterval
+from direct.interval.IntervalGlobal import Sequence, Wait, Func, LerpFunc
 from direct.fsm.FSM import FSM
 from settings_page import SettingsPage
 from screen_title import TitleScreen
 from action_card_popup import ActionCardPopup
+from game_rules import GameRules, HUMAN, BOT, BUY, RENT, AUCTION, PASS
+from board import SPECIAL
+from lane_view import LaneView, BatchedLaneView
+from bot_strategies import get_strategy
+from mcts_bot import make_thinker
+from asset_cache import AssetCache
+from dice import DiceAnimator, build_atlas, ROLL_DURATION
+from procedural_textures.main import ensure_textures
+from instrumentation import Tracer, TRACE
+from journal import Journal
+from replay import Recorder, RngStreams, new_game, read_replay
+from savegame import Saver
+from snapshots import History
 
 DEBUG = os.environ.get("DEBUG")
+# cards on the board, past board.LAZY_THRESHOLD cards are generated on demand
+BOARD_SIZE = int(os.environ.get("BOARD_SIZE", "20"))
+# "nodes" draws a node per card, "batched" a couple of draw calls per lane,
+# the web build is draw call bound so it defaults to batched
+LANE_RENDER_MODE = os.environ.get("LANE_RENDER_MODE", "batched" if sys.platform == "emscripten" else "nodes")
+# strategy used by the bot, see bot_strategies.py
+BOT_STRATEGY = os.environ.get("BOT_STRATEGY", "cautious")
+# seconds the mcts bot may think about a popup
+BOT_THINK_BUDGET = float(os.environ.get("BOT_THINK_BUDGET", "0.5"))
+# animation speed: "1" as designed, "10" ten times faster, "instant" skips
+# the animations and the bot popups altogether
+TURBO = os.environ.get("TURBO", "1")
+TIME_SCALE = 0 if TURBO == "instant" else float(TURBO)
+# strategy playing the human lane, bot vs bot games restart when over
+AUTOPLAY = os.environ.get("AUTOPLAY")
+# seconds the lane slides for on a move, and the bot shows its pick for
+SLIDE_DURATION = 0.9
+BOT_CONFIRM_DELAY = 1.0
+GAME_OVER_DELAY = 3.0
+# candidate boards searched for the fairest one on a new game, 0 plays the
+# first random board, see fair_board.py
+FAIR_BOARD = int(os.environ.get("FAIR_BOARD", "0"))
+# every change to the game is appended to this file, see journal.py
+JOURNAL = os.environ.get("JOURNAL")
+# every random stream derives from this seed, see replay.py
+SEED = int(os.environ.get("SEED", random.SystemRandom().randrange(2**32)))
+# the seed and the decisions of every game are recorded to this file
+RECORD = os.environ.get("RECORD")
+# starts on a recorded game at REPLAY_TURN instead of a new one
+REPLAY = os.environ.get("REPLAY")
+REPLAY_TURN = int(os.environ.get("REPLAY_TURN", "0"))
+# F5 saves the game to this file, F6 loads it back, see savegame.py
+SAVE_FILE = os.environ.get("SAVE_FILE", "monopoly.save")
+# starts on the saved game instead of a new one
+LOAD = os.environ.get("LOAD")
+# "offscreen" renders into a buffer with no display, "none" runs the game
+# with no rendering at all, see frame_capture.py
+WINDOW_TYPE = os.environ.get("WINDOW_TYPE")
 
 # tell Panda to make a 1024×600 window, windowed (not fullscreen)
 loadPrcFileData("", """
@@ -30,6 +82,8 @@ loadPrcFileData("", """
     fullscreen 0
     show-frame-rate-meter 0
 """)
+if WINDOW_TYPE:
+    loadPrcFileData("", f"window-type {WINDOW_TYPE}")
 
 logging.basicConfig(level=logging.INFO)
 
@@ -40,8 +94,40 @@ class Monopoly2d(ShowBase, FSM):
 
         logging.info("Entering init")
 
+        # times states, popups and intervals, see instrumentation.py
+        self.tracer = Tracer()
+        self.tracer.instrument_fsm(self)
+        self.accept("f9", self.tracer.dump)
+        if TRACE:
+            atexit.register(self.tracer.dump)
+
+        # game history, written by a background thread
+        self.journal = Journal(JOURNAL) if JOURNAL else None
+        if self.journal:
+            atexit.register(self.journal.close)
+
+        # one random stream per subsystem, a game is replayed from its seed
+        logging.info("seed %d", SEED)
+        self.streams = RngStreams(SEED)
+        # ShowBase already has a recorder attribute, its own
+        self.replay_recorder = Recorder(RECORD) if RECORD else None
+        if self.replay_recorder:
+            atexit.register(self.replay_recorder.close)
+        self.replay_game = read_replay(REPLAY)[0] if REPLAY else None
+
+        # saves are written by a worker thread
+        self.saver = Saver(SAVE_FILE)
+        self.load_on_start = bool(LOAD)
+        atexit.register(self.saver.close)
+        self.accept("f5", self.save_game)
+
+        # lane backgrounds and tiles are generated, draw the missing ones
+        ensure_textures()
+        # every screen loads through the shared cache, see asset_cache.py
+        self.assets = AssetCache(self)
+
         # initialize variables
-        self.count_monopoly_cards = 20        # total rectangles per lane
+        self.count_monopoly_cards = BOARD_SIZE        # total rectangles per lane
         self.visible_slots  = 2         # how many fit on screen at once
         self.card_height    = 1
         self.scroll_speed   = 1         # slots per second when holding key
@@ -55,40 +141,42 @@ class Monopoly2d(ShowBase, FSM):
         self.left_content  = None
         self.right_content = None
         self.monopoly_map = None
-        self.rects_left  = []
-        self.rects_right = []
-        self.index1       = 0   # player1 on right
-        self.index2       = 0   # player2 on left
+        self.left_view = None
+        self.right_view = None
         self.guide_text = None
         self.inventory_left_text = None
         self.inventory_right_text = None
 
         # dices
-        self.dice = []
-        self.dice_textures = None
+        self.dice_atlas = None
+        self.dice_animator = None
         self.value_dice_1 = 1
         self.value_dice_2 = 1
 
-        # which actor is in charge of action now
-        self.actor = "human"
-
-        # inventory storage
-        self.human_inventory = {}
-        self.bot_inventory = {}
-
         # powers
-        self.powers = ["cheaper_upgrades", "bonus"]
         # 10% discount
         self.power_cheaper_upgrades = 10
         # 30 $
         self.power_bonus = 30
 
+        # rules and state live outside of the renderer, see game_rules.py
+        self.rules = GameRules(
+            board_size=self.count_monopoly_cards,
+            power_bonus=self.power_bonus,
+            power_cheaper_upgrades=self.power_cheaper_upgrades
+        )
+        # dealt from the seeded streams by prepare_inventory
+        self.game = None
+        self.history = History()
+        # the strategies draw apart from the dice, the replay only records their picks
+        self.bot_strategy = get_strategy(BOT_STRATEGY, self.streams.strategy)
+        self.human_strategy = get_strategy(AUTOPLAY, self.streams.strategy) if AUTOPLAY else None
+        # an mcts strategy thinks off the render task, whichever lane it plays, see mcts_bot.py
+        self.thinker = make_thinker() if "mcts" in (BOT_STRATEGY, AUTOPLAY) else None
+
         # popup
         self.popup = None
 
-        # tracks how many turns have passed
-        self.turn = 0
-
         # settings page
         self.settings = None
 
@@ -104,6 +192,43 @@ class Monopoly2d(ShowBase, FSM):
             self.titlescreen = TitleScreen(base=self, on_start=self.enter_settings)
 #            self.titlescreen = TitleScreen(base=self, on_start=lambda: self.request("Idle"))
 
+    # the FSM and the lanes read the game state through these
+    @property
+    def actor(self):
+        """which actor is in charge of action now"""
+        return self.game.actor
+
+    @property
+    def turn(self):
+        """tracks how many turns have passed"""
+        return self.game.turn
+
+    @property
+    def index1(self):
+        """player1 on right"""
+        return self.game.positions[HUMAN]
+
+    @index1.setter
+    def index1(self, value):
+        self.game.positions[HUMAN] = value
+
+    @property
+    def index2(self):
+        """player2 on left"""
+        return self.game.positions[BOT]
+
+    @index2.setter
+    def index2(self, value):
+        self.game.positions[BOT] = value
+
+    @property
+    def human_inventory(self):
+        return self.game.inventories[HUMAN]
+
+    @property
+    def bot_inventory(self):
+        return self.game.inventories[BOT]
+
     def enter_settings(self):
 #        self.titlescreen.cleanup()
         self.settings = SettingsPage(
@@ -130,7 +255,7 @@ class Monopoly2d(ShowBase, FSM):
         # )
 
         # Load and display the background image on a full-screen quad
-        tex = self.loader.loadTexture("assets/stagno.png")
+        tex = self.assets.texture("assets/stagno.png")
         cm  = CardMaker("bg_stagno")
         cm.setFrame(-self.getAspectRatio(),
             0.0,
@@ -166,7 +291,7 @@ class Monopoly2d(ShowBase, FSM):
         )
 
         # Load and display the background image on a full-screen quad
-        tex = self.loader.loadTexture("assets/forest.png")
+        tex = self.assets.texture("assets/forest.png")
         cm  = CardMaker("bg_forest")
         cm.setFrame(0.0,
             self.getAspectRatio(),
@@ -241,10 +366,9 @@ class Monopoly2d(ShowBase, FSM):
             align=TextNode.ALeft
         )
 
-        # generate the map of the game
-        for card in self._generate_map():
-            print(card)
-        self.monopoly_map = self.generate_map()
+        # generate the map of the game, a new game comes with a new board
+        self.prepare_inventory()
+        self.monopoly_map = self.game.board
 
         # populate the lanes
         self.left_lane  = bg_left.attachNewNode("left_lane")
@@ -270,54 +394,34 @@ class Monopoly2d(ShowBase, FSM):
         self.right_lane.setScale(0.5, 1, 1)
         self.right_lane.setX(0.5)
 
-        # each lane gets a “content” NodePath under which we create ALL cards
-        self.left_content  = self.left_lane.attachNewNode("left_content")
-
-        self.right_content = self.right_lane.attachNewNode("right_content")
-
-        # compute the slot width so exactly visible_slots fill –1→+1
-        width = 2.0 / self.visible_slots
-
-        self.rects_left  = []
-        self.rects_right = []
-        for i, v in enumerate(self.monopoly_map):
-            # left
-            cm = CardMaker(f"L{i}")
-            cm.setFrame(-width/2, +width/2, -self.card_height/2, +self.card_height/2)
-            node = self.left_content.attachNewNode(cm.generate())
-            node.setX(-self.getAspectRatio() - 0.5 + width/2 + i*width)
-            node.setZ(0.1)
-            node.setColor(self.generate_color_from_map(v))
-            text = OnscreenText(
-                text=str(v),  # Rectangle number
-                pos=(0, self.card_height/2 - 0.1),  # Positioning above the rectangle
-                scale=0.1,
-                fg=(1, 1, 1, 1),  # White text
-                parent=node,  # Attach to the rectangle
-                align=TextNode.ACenter
-            )
-            self.rects_left.append(node)
-
-            # right
-            cm2 = CardMaker(f"R{i}")
-            cm2.setFrame(-width/2, +width/2, -self.card_height/2, +self.card_height/2)
-            node2 = self.right_content.attachNewNode(cm2.generate())
-            node2.setX(-0.75 + width/2 + i*width)
-            node2.setZ(0.1)
-            node2.setColor(self.generate_color_from_map(v))
-            text2 = OnscreenText(
-                text=str(v),  # Rectangle number
-                pos=(0, self.card_height/2 - 0.1),  # Positioning above the rectangle
-                scale=0.1,
-                fg=(1, 1, 1, 1),  # White text
-                parent=node2,  # Attach to the rectangle
-                align=TextNode.ACenter
-            )
-            self.rects_right.append(node2)
+        # each lane only keeps a small pool of cards around the viewport
+        lane_view_class = BatchedLaneView if LANE_RENDER_MODE == "batched" else LaneView
+        self.left_view = lane_view_class(
+            self.left_lane, "left_content", self.monopoly_map, "L",
+            x_origin=-self.getAspectRatio() - 0.5,
+            color_for=self.generate_color_from_map,
+            visible_slots=self.visible_slots,
+            card_height=self.card_height,
+            texture=self.assets.texture("assets/tile.png")
+        )
+        self.left_content = self.left_view.content
+
+        self.right_view = lane_view_class(
+            self.right_lane, "right_content", self.monopoly_map, "R",
+            x_origin=-0.75,
+            color_for=self.generate_color_from_map,
+            visible_slots=self.visible_slots,
+            card_height=self.card_height,
+            texture=self.assets.texture("assets/tile.png")
+        )
+        self.right_content = self.right_view.content
 
-        # prepares inventory
-        self.prepare_inventory()
+        # shows the inventory
         self.draw_inventory()
+        # a replayed game starts where the players stand
+        if self.game.turn:
+            self._update_view(self.left_view, self.index2)
+            self._update_view(self.right_view, self.index1)
 
         self.accept("arrow_left",  self.move1, [-1])
         self.accept("arrow_right", self.move1, [+1])
@@ -327,7 +431,7 @@ class Monopoly2d(ShowBase, FSM):
     def draw_inventory(self):
         """draws the inventory adding initial power and gold"""
         human_gold = self.human_inventory.get("money", 0)
-        bot_gold = self.human_inventory.get("money", 0)
+        bot_gold = self.bot_inventory.get("money", 0)
         human_power = self.human_inventory.get("power", "")
         bot_power = self.bot_inventory.get("power", "")
         human_message = f"Gold: {human_gold} $\nPower: {human_power}"
@@ -344,48 +448,42 @@ class Monopoly2d(ShowBase, FSM):
 
     def prepare_inventory(self):
         """inventory is prepared with starting money and random powers"""
-        # set power
-        powers = self.powers
-        human_power = random.choice(powers)
-        powers.remove(human_power)
-        bot_power = powers[0]
-
-        # set starting money
-        starting_money = 100
-        self.human_inventory = {
-            "power": human_power,
-            "money": starting_money,
-            "cards": [{}]
-        }
-        self.bot_inventory = {
-            "power": bot_power,
-            "money": starting_money,
-            "cards": [{}]
-        }
+        # None when the game does not start from a seed
+        game_seed = None
+        if self.replay_game:
+            # only the first game is the recorded one
+            self.rules, self.game = self.replay_game.seek(REPLAY_TURN)
+            self.replay_game = None
+            logging.info("replaying from turn %d", self.game.turn)
+        elif not (self.load_on_start and self._read_save()):
+            game_seed = self.streams.games.getrandbits(63)
+            self.game = new_game(self.rules, game_seed, FAIR_BOARD)
+            if self.replay_recorder:
+                self.replay_recorder.attach(self.game, self.rules, game_seed, FAIR_BOARD)
+        self.load_on_start = False
+        if self.journal:
+            self.journal.attach(self.game, game_seed, FAIR_BOARD)
+        # a replay or a save may not have BOARD_SIZE cards
+        self.count_monopoly_cards = len(self.game.board)
+        # a snapshot per turn, backspace goes back to the previous human turn
+        self.history = History()
+        self.history.record(self.game, self.rules.rng)
 
     def setup_dices(self, nodename):
         """adds the dices to the bg_scoring"""
         # clears the parent color or the texture won't show!
         nodename.clearColor()
-        # 1) Load the six face‐textures once
-        self.dice_textures = [
-            self.loader.loadTexture(f"assets/Dice-{i}.png")
-            for i in range(1,7)
-        ]
-
-        # 2) Create two dice quads in aspect2d
-        self.dice = []
-        positions = [1, 1.2]    # X positions for Die1 / Die2
-        size      = 0.07            # half-width and half-height of each die
+        # 1) Pack the six faces in one atlas once
+        if self.dice_atlas is None:
+            self.dice_atlas = build_atlas([f"assets/Dice-{i}.png" for i in range(1, 7)])
 
-        for i, x in enumerate(positions):
-            cm = CardMaker(f"die{i+1}")
-            cm.setFrame(-size, size, -size, size)
-            node = nodename.attachNewNode(cm.generate())
-            node.setPos(x, 0, 0.9)
-            # start with face “1”
-            node.setTexture(self.dice_textures[0], 1)
-            self.dice.append(node)
+        # 2) Create two dice quads in aspect2d, a face is a uv offset in the atlas
+        positions = [1, 1.2]    # X positions for Die1 / Die2
+        self.dice_animator = DiceAnimator(self, nodename, self.dice_atlas, positions, size=0.07, z=0.9,
+                                          rng=self.streams.flashes)
+        self.dice_animator.duration = self._scaled(ROLL_DURATION)
+        if TIME_SCALE == 0:
+            self.dice_animator.flashes = 0
 
     def enterIdle(self):
         """Show the configuration menu."""
@@ -431,8 +529,6 @@ class Monopoly2d(ShowBase, FSM):
         logging.info(f"enter PlayGame for {self.actor}")
         self.update_guide_text(role="start")
 
-        self.turn += 1
-
         if self.debug:
             logging.info("Debug Jump to RollDice")
             self.taskMgr.doMethodLater(
@@ -441,12 +537,20 @@ class Monopoly2d(ShowBase, FSM):
                 "humanRollNow"
             )
 
+        # counts the turn, then check_victory and check_powers
+        self.rules.start_turn(self.game)
+        self.rules.check_turn_limit(self.game)
         self.check_victory()
         self.check_powers()
 
-        if self.actor == "human":
+        if self.game.over and AUTOPLAY:
+            return
+
+        if self.actor == "human" and not AUTOPLAY:
             self.accept("enter", self.request, ["RollDice"])
-        elif self.actor == "bot":
+            self.accept("backspace", self.undo)
+            self.accept("f6", self.load_game)
+        else:
             self.taskMgr.doMethodLater(
                 0,
                 self.enterRollDice,
@@ -454,27 +558,13 @@ class Monopoly2d(ShowBase, FSM):
             )
 
     def check_powers(self):
-        """We check powers to know if we need to update inventory"""
+        """We check powers to know if we need to update inventory
+        the income itself is applied by the rules in start_turn"""
         logging.info("Check Powers to update inventory")
-        if self.actor == "human":
-            human_power = self.human_inventory.get("power", "")
-            if human_power == "bonus":
-                human_gold = self.human_inventory.get("money", 0)
-                human_gold += self.power_bonus
-                self.human_inventory["money"] = human_gold
-
-                human_message = f"Gold: {self.human_inventory.get("money", 0)} $\nPower: {human_power}"
-                self.update_inventory("human", human_message)
-
-        if self.actor == "bot":
-            bot_power = self.bot_inventory.get("power", "")
-            if bot_power == "bonus":
-                bot_gold = self.bot_inventory.get("money", 0)
-                bot_gold += self.power_bonus
-                self.bot_inventory["money"] = bot_gold
-
-                bot_message = f"Gold: {self.bot_inventory.get("money", 0)} $\nPower: {bot_power}"
-                self.update_inventory("bot", bot_message)
+        inventory = self.game.inventory()
+        if inventory.get("power", "") == "bonus":
+            message = f"Gold: {inventory.get("money", 0)} $\nPower: {inventory.get("power", "")}"
+            self.update_inventory(self.actor, message)
 
         logging.info("End check Powers to update inventory")
 
@@ -482,54 +572,105 @@ class Monopoly2d(ShowBase, FSM):
     def check_victory(self):
         """Victory is: 
             One of the players has no money and no properties
-            One of the players has completed a mission"""
-        human_gold = self.human_inventory.get("money", 0)
-        bot_gold = self.bot_inventory.get("money", 0)
-
-        logging.info("Human gold is: %s, Bot gold is: %s", human_gold, bot_gold)
-
-        if human_gold <= 0:
-            self.update_guide_text(role="loss", target="human")
-            self.game_over(target="human")
+            One of the players has completed a mission
+        the check itself is done by the rules in start_turn"""
+        logging.info("Human gold is: %s, Bot gold is: %s",
+                     self.human_inventory.get("money", 0), self.bot_inventory.get("money", 0))
 
-        if bot_gold <= 0:
-            self.update_guide_text(role="loss", target="bot")
-            self.game_over(target="bot")
+        if self.game.loser:
+            self.update_guide_text(role="loss", target=self.game.loser)
+            self.game_over(target=self.game.loser)
+        elif self.game.over:
+            self.game_over(target=None)
 
         logging.info("Game continues... we're at turn %d", self.turn)
 
     def game_over(self, target):
-        """exit"""
-        logging.info("%s lost the game", target)
+        """exit, bot vs bot games start over"""
+        logging.info("%s lost the game, %s wins", target, self.game.winner)
+        if AUTOPLAY:
+            self.taskMgr.doMethodLater(self._scaled(GAME_OVER_DELAY), self._new_game, "newGame")
+
+    def _new_game(self, task=None):
+        """a new board in the lanes already drawn"""
+        self.prepare_inventory()
+        self.monopoly_map = self.game.board
+        self.left_view.set_board(self.monopoly_map)
+        self.right_view.set_board(self.monopoly_map)
+        self.draw_inventory()
+        self.enterPlayGame()
+        return Task.done
+
+    def undo(self):
+        """back to the start of the previous human turn, the dice come out
+        the same, the decisions may not"""
+        if self.journal or self.replay_recorder:
+            # both files are append only
+            logging.info("no undo while recording")
+            return
+        # the last snapshot ended the bot turn, the one before the human turn
+        turn = self.game.turn - 3
+        if turn not in self.history:
+            return
+        logging.info("undo to turn %d", turn + 1)
+        self.game = self.history.rewind(turn, self.rules.rng)
+        self._resume_game()
+
+    def save_game(self):
+        """saves the game as the last turn ended"""
+        if self.history.latest:
+            self.saver.save(self.history.latest, self.rules)
+
+    def load_game(self):
+        """the saved game in the lanes already drawn"""
+        if self.journal or self.replay_recorder:
+            logging.info("no load while recording")
+            return
+        if not self._read_save():
+            return
+        self.count_monopoly_cards = len(self.game.board)
+        self.history = History()
+        self.history.record(self.game, self.rules.rng)
+        if self.game.board is not self.monopoly_map:
+            # only the pools rebind, the lanes stay
+            self.monopoly_map = self.game.board
+            self.left_view.set_board(self.monopoly_map)
+            self.right_view.set_board(self.monopoly_map)
+        self._resume_game()
+
+    def _read_save(self):
+        """puts the saved game in place, False when there is none to load"""
+        try:
+            self.rules, self.game = self.saver.load()
+        except (OSError, ValueError) as error:
+            logging.info("no save loaded from %s: %s", SAVE_FILE, error)
+            return False
+        logging.info("loaded turn %d from %s", self.game.turn, SAVE_FILE)
+        return True
+
+    def _resume_game(self):
+        """shows a game put back between two turns and plays on"""
+        self.ignore("backspace")
+        self.ignore("f6")
+        self._update_view(self.left_view, self.index2)
+        self._update_view(self.right_view, self.index1)
+        self.draw_inventory()
+        self.enterPlayGame()
 
     def enterRollDice(self, task=None):
         logging.info("Rolling dice as %s", self.actor)
+        self.ignore("backspace")
+        self.ignore("f6")
 
         # pick final results
-        self.value_dice_1 = random.randint(1,6)
-        self.value_dice_2 = random.randint(1,6)
-
-        # build an animation Sequence
-        seq = Sequence()
-        # flash random faces ~20 times at 0.05 s per flash (~1 s total)
-        for _ in range(20):
-            f1 = random.randint(1,6)
-            f2 = random.randint(1,6)
-            seq.append(Func(self._set_faces, f1, f2))
-            seq.append(Wait(0.05))
-        # finally show the real roll
-        seq.append(Func(self._set_faces, self.value_dice_1, self.value_dice_2))
-        seq.start()
-        self.taskMgr.doMethodLater(
-            seq.getDuration(),
-            self._finish_roll_task,
-            "finishRoll"
-        )
+        self.value_dice_1, self.value_dice_2 = self.rules.roll_dice(self.game)
 
-    def _finish_roll_task(self, task):
-        logging.info(f"Transition to {task}")
+        # flash random faces ~20 times (~1 s total), then show the real roll
+        self.dice_animator.roll((self.value_dice_1, self.value_dice_2), self._finish_roll)
+
+    def _finish_roll(self):
+        logging.info("Transition to MovePlayer")
         self.request("MovePlayer")
-        return Task.done
 
     def enterMovePlayer(self):
         logging.info(f"Entered PlayerMove as {self.actor}")
@@ -544,153 +685,20 @@ class Monopoly2d(ShowBase, FSM):
 
     def exitMovePlayer(self):
         """switch actor"""
-
-        if self.actor == "human":
-            self.actor = "bot"
-        else:
-            self.actor = "human"
+        self.rules.end_turn(self.game)
+        self.history.record(self.game, self.rules.rng)
     ### end FSM ###
 
     def _set_faces(self, f1, f2):
-        """Helper to set both dice’s textures to faces f1 and f2."""
-        self.dice[0].setTexture(self.dice_textures[f1-1], 1)
-        self.dice[1].setTexture(self.dice_textures[f2-1], 1)
-
-    def generate_color_from_map(self, position):
-        # Possible elements for contiguous blocks
-        block_elements = ["Road", "Street", "Castle", "Palace", "Corner"]
-        block_element_titles = ["Windsor", "Versailles", "Edinburgh", "Regent", "Victoria", "Kensington", "Balmoral", "Trafalgar", "Piccadilly", "Lancaster", "Dover", "Hampton", "York", "Nottingham"]
-
-        # Elements that follow a contiguous block
-        special_elements = ["station", "facility", "prison", "hospital", "museum", "hotel", "shop"]
+        """Helper to set both dice to faces f1 and f2."""
+        self.dice_animator.show(f1, f2)
 
-        if position in special_elements:
+    def generate_color_from_map(self, index):
+        """specials stand out from the other cards"""
+        if self.monopoly_map.types[index] == SPECIAL:
             return LColor(.82, .91, .86, 1)
-        
-        return LColor(.69, .69, .69, 1)
 
-    def _generate_map(self):
-        # 1) base data
-        block_elements   = ["Road", "Street", "Castle", "Palace", "Corner"]
-        block_titles     = [
-            "Windsor", "Versailles", "Edinburgh", "Regent", "Victoria",
-            "Kensington", "Balmoral", "Trafalgar", "Piccadilly",
-            "Lancaster", "Dover", "Hampton", "York", "Nottingham"
-        ]
-        special_elements = ["Station", "Facility", "Prison", "Hospital", "Museum", "Hotel", "Shop"]
-
-        # clubs
-        clubs = [
-            "Ritter Butzke",
-            "Renate",
-            "Berghain",
-            "KitKat",
-            "Tresor",
-            "Matrix",
-            "Watergate"
-            ]
-
-        # bezirks
-        berlin_landmarks = [
-            "Brandenburg Gate", "Reichstag", "Berlin Cathedral",
-            "TV Tower", "Museum Island", "Checkpoint Charlie",
-            "East Side Gallery", "Charlottenburg Palace", "Potsdamer Platz"
-        ]
-
-        # 2) prepare a shuffled pool of all unique block names
-        block_name_pool = [
-            f"{elem} {title}"
-            for elem in block_elements
-            for title in block_titles
-        ]
-        random.shuffle(block_name_pool)
-
-        # 3) assign a fixed color+price to each special type
-        special_cfg = {}
-        for se in special_elements:
-            price = random.choice(range(40, 101, 10))  # 40,50,…,100
-            color = "#{:06x}".format(random.randint(0, 0xFFFFFF))
-            special_cfg[se] = {"price": price, "color": color}
-
-        # 4) start the map
-        result = [
-            {"name": "start", "type": "start", "price": None, "color": None}
-        ]
-
-        # 5) fill middle cards
-        #    leave room for the final "end" card
-        while len(result) < self.count_monopoly_cards - 1:
-            # a) make a contiguous block of size 2 or 3
-            block_size  = random.choice([2, 3])
-            block_color = "#{:06x}".format(random.randint(0, 0xFFFFFF))
-            # draw unique names from the pool
-            block_names = []
-            for _ in range(block_size):
-                if not block_name_pool:
-                    break
-                block_names.append(block_name_pool.pop())
-            if not block_names:
-                break  # no more unique blocks available
-
-            # pick unique prices for this block (step of 5)
-            block_prices = random.sample(range(20, 201, 5), len(block_names))
-
-            for name, price in zip(block_names, block_prices):
-                result.append({
-                    "name":  name,
-                    "type":  "block",
-                    "price": price,
-                    "color": block_color,
-                })
-
-            # stop if we’ve reached the limit
-            if len(result) >= self.count_monopoly_cards - 1:
-                break
-
-            # b) add one special card
-            se  = random.choice(special_elements)
-            cfg = special_cfg[se]
-            result.append({
-                "name":  se,
-                "type":  "special",
-                "price": cfg["price"],
-                "color": cfg["color"],
-            })
-
-        # 6) append the "end" card
-        result.append({"name": "end", "type": "end", "price": None, "color": None})
-
-        return result
-
-    def generate_map(self):
-        # Possible elements for contiguous blocks
-        block_elements = ["Road", "Street", "Castle", "Palace", "Corner"]
-        block_element_titles = ["Windsor", "Versailles", "Edinburgh", "Regent", "Victoria", "Kensington", "Balmoral", "Trafalgar", "Piccadilly", "Lancaster", "Dover", "Hampton", "York", "Nottingham"]
-
-        # Elements that follow a contiguous block
-        special_elements = ["station", "facility", "prison", "hospital", "museum", "hotel", "shop"]
-
-        result = ["start"]
-        while len(result) < (self.count_monopoly_cards - 1):
-            # Create a contiguous block of 2 or 3 identical items
-            block_size = random.choice([2, 3])
-            for _ in range(block_size):
-                block_element = random.choice(block_elements)
-                block_element_title = random.choice(block_element_titles)
-                block_name = f"{block_element} {block_element_title}"
-                result.append(block_name)
-
-            # Ensure we don't exceed the limit
-            if len(result) >= self.count_monopoly_cards:
-                break
-
-            # Add a special element
-            result.append(random.choice(special_elements))
-
-        # close the list
-        result.append("end")
-
-        return result
+        return LColor(.69, .69, .69, 1)
 
     def create_background(self, nodename, parent, left, right, bottom, top, color):
         """Creates a background that spans the given horizontal range."""
@@ -711,94 +719,93 @@ class Monopoly2d(ShowBase, FSM):
         self._update_left_view()
 
     def _update_right_view(self):
-        half = self.visible_slots//2
-        selected_visible_index = int(round(self.index1))
-        start1 = min( max(selected_visible_index-half, 0), self.count_monopoly_cards-self.visible_slots )
-        self.right_content.setX( -start1 * (2.0/self.visible_slots) )
-        # refresh highlight
-        for r in self.rects_right: r.setScale(1,1,1)
-        self.rects_right[selected_visible_index].setScale(1.2,1,1.2)
+        self._update_view(self.right_view, self.index1)
 
     def _update_left_view(self):
-        # same as above but for left_content and rects_left
-        half = self.visible_slots//2
-        selected_visible_index   = int(round(self.index2))
-        start2 = min( max(selected_visible_index-half, 0), self.count_monopoly_cards-self.visible_slots )
-        self.left_content.setX( -start2 * (2.0/self.visible_slots) )
-        for r in self.rects_left: r.setScale(1,1,1)
-        self.rects_left[selected_visible_index].setScale(1.2,1,1.2)
+        self._update_view(self.left_view, self.index2)
 
-    def smooth_variant_move1(self, delta):
-        # compute old & new indices
-        selected_node_path = None
-        selected_card = None
-        card_position = None
-        card_name = ""
-
-        if self.actor == "human":
-            old_index = self.index1
-            new_index = (old_index + delta) % self.count_monopoly_cards
-            self.index1 = new_index
+    def _update_view(self, view, index):
+        selected_visible_index = int(round(index))
+        view.scroll_to(selected_visible_index)
+        # only the previous and the new card are rescaled
+        view.highlight(selected_visible_index)
 
-            selected_node_path = self.right_content
+    def _view_for(self, actor):
+        """the human plays on the right lane, the bot on the left one"""
+        return self.right_view if actor == "human" else self.left_view
 
-            card_np = selected_node_path.find(f"**/R{new_index}")
-            if not card_np.isEmpty():
-                selected_card = card_np
+    def _strategy_for(self, actor):
+        """the strategy picking for an actor, None when a person plays it"""
+        return self.bot_strategy if actor == "bot" else self.human_strategy
 
-            card_name = self.monopoly_map[self.index1]
+    def _scaled(self, seconds):
+        """an animation duration at the TURBO speed"""
+        return seconds / TIME_SCALE if TIME_SCALE else 0
 
-        elif self.actor == "bot":
-            old_index = self.index2
-            new_index = (old_index + delta) % self.count_monopoly_cards
-            self.index2 = new_index
-
-            selected_node_path = self.left_content
-
-            card_np = selected_node_path.find(f"**/L{new_index}")
-            if not card_np.isEmpty():
-                selected_card = card_np
-
-            card_name = self.monopoly_map[self.index2]
-
-        card_position = selected_card.getPos()
-
-        # figure out the scroll‐offset before & after, exactly as in _update_right_view()
-        half   = self.visible_slots // 2
-        width  = 2.0 / self.visible_slots
-        start_old = min(max(old_index - half, 0), self.count_monopoly_cards - self.visible_slots)
-        start_new = min(max(new_index - half, 0), self.count_monopoly_cards - self.visible_slots)
-        x_old = -start_old * width
-        x_new = -start_new * width
-
-        # build a 0.5s slide from x_old→x_new, then re‐highlight the cards
-        slide = LerpPosInterval(
-            nodePath = selected_node_path,
-            duration = 0.9,               # tweak for faster/slower
-            pos      = (x_new, 0, 0),
-            startPos = (x_old, 0, 0),
+    def smooth_variant_move1(self, delta):
+        # compute old & new indices
+        old_index, new_index = self.rules.move(self.game, delta)
+
+        view = self._view_for(self.actor)
+
+        selected_node_path = view.content
+        # the landed card may not be bound yet, its position is computed
+        card_position = view.card_pos(new_index)
+        card_name = self.monopoly_map.name(new_index)
+
+        # figure out the scroll‐offset before & after, exactly as in _update_view()
+        start_old = view.start_for(old_index)
+        start_new = view.start_for(new_index)
+
+        if TIME_SCALE == 0:
+            # no slide, jump to the card and go on
+            view.set_scroll(start_new)
+            self._play_popup(selected_node_path, card_position, card_name)
+            self._highlight_card(view, new_index)
+            return
+
+        # slide from start_old→start_new, the lane rebinds its pool on the way
+        slide = LerpFunc(
+            view.set_scroll,
+            duration = self._scaled(SLIDE_DURATION),
+            fromData = start_old,
+            toData   = start_new,
             blendType= 'easeInOut'        # optional smoothing
         )
-        highlight = Func(self._highlight_card)
+        highlight = Func(self._highlight_card, view, new_index)
         popup = Func(self._play_popup, selected_node_path, card_position, card_name)
 
         # play them in order
-        Sequence(slide, popup, highlight).start()
+        self.tracer.interval("move", slide, popup, highlight).start()
 
     def attempt_buy(self):
-        print("Attempting to buy")
+        logging.info("%s attempts to buy", self.actor)
+        self.rules.resolve(self.game, BUY)
         self._close_popup_and_continue()
 
     def pay_rent(self):
-        print("Paying rent")
+        logging.info("%s pays rent", self.actor)
+        self.rules.resolve(self.game, RENT)
         self._close_popup_and_continue()
 
     def start_auction(self):
-        print("Starting auction")
+        logging.info("%s starts an auction", self.actor)
+        # there is no bidding UI yet, the human offers the full price
+        price = self.game.board.prices[self.game.position()]
+        bids = {
+            HUMAN: min(price, self.human_inventory["money"] - 1),
+            BOT: self.bot_strategy.bid(self.rules, self.game, BOT),
+        }
+        if self.human_strategy:
+            bids[HUMAN] = self.human_strategy.bid(self.rules, self.game, HUMAN)
+        winner = self.rules.resolve(self.game, AUCTION, bids)
+        logging.info("auction won by %s", winner)
         self._close_popup_and_continue()
 
     def skip_turn(self):
-        print("Skipping turn")
+        logging.info("%s skips", self.actor)
+        # rent is paid even when skipping
+        self.rules.resolve(self.game, PASS)
         self._close_popup_and_continue()
 
     def _play_popup(self, selected_node_path, card_position, card_name):
@@ -809,53 +816,79 @@ class Monopoly2d(ShowBase, FSM):
         def auc_cb():  self.start_auction()
         def skip_cb():  self.skip_turn()
 
+        options = {
+            "buy":   ("Buy Property", buy_cb),
+            "rent":  ("Pay Rent",   rent_cb),
+            "auction":("Auction",   auc_cb),
+            "pass":  ("Skip",       skip_cb),
+        }
+        strategy = self._strategy_for(self.actor)
+        thinker = self.thinker if strategy and strategy.name == "mcts" else None
+        # closed in _close_popup_and_continue
+        self.tracer.begin("popup", self.actor)
+
+        if strategy and TIME_SCALE == 0 and not thinker:
+            # nothing to watch, the pick is resolved without a popup, on
+            # the next frame since the FSM is still entering MovePlayer
+            choice = strategy.decide(self.rules, self.game)
+            logging.info("%s picks %s", self.actor, choice)
+            self.taskMgr.doMethodLater(0, options[choice][1], "autoPick", extraArgs=[])
+            return
+
         self.popup = ActionCardPopup(
             parent=selected_node_path,
             position=card_position,
-            options={
-                "buy":   ("Buy Property", buy_cb),
-                "rent":  ("Pay Rent",   rent_cb),
-                "auction":("Auction",   auc_cb),
-                "pass":  ("Skip",       skip_cb),
-            },
+            options=options,
             texture="assets/monopoly_panel.png",
     #        font_path="assets/fonts/sierras_font.ttf",
             scale=0.7
         )
 
+        if thinker:
+            thinker.start(self.rules, self.game, BOT_THINK_BUDGET)
+            self.taskMgr.add(self._bot_think_task, "botThink")
+        elif strategy:
+            self._bot_pick(strategy.decide(self.rules, self.game))
+
+    def _bot_think_task(self, task):
+        """polls the thinker once per frame, never waits on it"""
+        choice = self.thinker.poll()
+        if choice is None:
+            return Task.cont
+        self._bot_pick(choice)
+        return Task.done
+
+    def _bot_pick(self, choice):
+        """the bot shows its pick on the card, then confirms it"""
+        logging.info("%s picks %s", self.actor, choice)
+        self.popup.select(choice)
+        self.taskMgr.doMethodLater(self._scaled(BOT_CONFIRM_DELAY), self._bot_confirm_popup, "botConfirmPopup")
+
+    def _bot_confirm_popup(self, task):
+        if self.popup:
+            self.popup._select_current()
+        return Task.done
+
     def _close_popup_and_continue(self):
         # destroy the popup if it hasn't already
         if hasattr(self, 'popup') and self.popup:
             self.popup.destroy()
             self.popup = None
+        self.tracer.end("popup", self.actor)
+
+        self.draw_inventory()
 
         # now go on to the next phase of your game:
         self._gotoPlayGame(task=None)
 
-    def _highlight_card(self):
-        """highlight logic"""
-        half = self.visible_slots//2
+    def userExit(self):
+        if self.thinker:
+            self.thinker.shutdown()
+        super().userExit()
 
-        if self.actor == "human":
-            selected_visible_index = int(round(self.index1))
-            # re‐position content in case of clamp at edges
-            start1 = min(max(selected_visible_index-half, 0), self.count_monopoly_cards-self.visible_slots)
-
-            self.right_content.setX(-start1*(2.0/self.visible_slots))
-            # rescale cards
-            for r in self.rects_right:
-                r.setScale(1,1,1)
-            self.rects_right[selected_visible_index].setScale(1.2,1,1.2)
-        else:
-            selected_visible_index = int(round(self.index2))
-            # re‐position content in case of clamp at edges
-            start2 = min(max(selected_visible_index-half, 0), self.count_monopoly_cards-self.visible_slots)
-
-            self.left_content.setX(-start2*(2.0/self.visible_slots))
-            # rescale cards
-            for r in self.rects_left:
-                r.setScale(1,1,1)
-            self.rects_left[selected_visible_index].setScale(1.2,1,1.2)
+    def _highlight_card(self, view, index):
+        """highlight logic, the slide already left the lane at its clamped scroll"""
+        view.highlight(index)
 
 async def main():
     app = Monopoly2d()
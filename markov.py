@@ -0,0 +1,162 @@
+"""landing probabilities of the 2d6 ring
+
+A move is always 2d6 around a ring of board_size tiles, so where a player
+lands is a Markov chain whose transition matrix only depends on the board
+size. The tables are computed once per size with NumPy and cached, after
+which every lookup is an index into an array:
+
+    from markov import expected_visits, landing_probability
+    expected_visits(20)[7]                  # landings on tile 7 in a game
+    landing_probability(20, 3, 7)           # on tile 7 after 3 moves
+    first_visits(20)[:, 7].sum()            # tile 7 reached at all
+
+The ring has no jail and no teleports, so the matrix is circulant and
+doubly stochastic: the stationary distribution is uniform, every tile is
+landed on 1/board_size of the time in the long run. What tells tiles apart
+is the finite horizon of a game, both players start on tile 0 and only move
+MAX_TURNS // 2 times each, which is what turn_distribution and
+expected_visits answer.
+
+    python markov.py --size 20
+"""
+import argparse
+import functools
+import logging
+import time
+
+import numpy as np
+
+from board import LAZY_THRESHOLD
+from game_rules import MAX_TURNS
+
+# probability of each face of a die and of each sum of 2d6, index is the value
+DIE = np.array([0] + [1 / 6] * 6)
+DICE = np.convolve(DIE, DIE)
+# moves of one player in a game, the turns alternate
+MOVES = MAX_TURNS // 2
+# past this many tiles the matrix is not built, the rows are convolved instead
+DENSE_LIMIT = LAZY_THRESHOLD
+# board sizes whose tables are kept
+CACHE_SIZE = 16
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+def _wrap(distribution, board_size):
+    """folds a distribution over 0..len-1 onto the ring"""
+    return np.bincount(np.arange(len(distribution)) % board_size, weights=distribution, minlength=board_size)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def step_distribution(board_size):
+    """where a single move from tile 0 lands"""
+    return _frozen(_wrap(DICE, board_size))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def transition_matrix(board_size):
+    """P[i, j], probability of landing on j when moving from i"""
+    if board_size > DENSE_LIMIT:
+        raise ValueError(f"no dense matrix past {DENSE_LIMIT} tiles")
+    row = step_distribution(board_size)
+    tiles = np.arange(board_size)
+    # circulant: row i is row 0 shifted by i
+    return _frozen(row[(tiles[None, :] - tiles[:, None]) % board_size])
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def stationary_distribution(board_size):
+    """long run share of landings per tile, uniform on this ring"""
+    if board_size > DENSE_LIMIT:
+        return _frozen(np.full(board_size, 1 / board_size))
+    # left eigenvector of eigenvalue 1: (P^T - I) pi = 0 with sum(pi) = 1
+    matrix = transition_matrix(board_size)
+    system = np.vstack([matrix.T - np.eye(board_size), np.ones(board_size)])
+    target = np.zeros(board_size + 1)
+    target[-1] = 1
+    pi, *_ = np.linalg.lstsq(system, target, rcond=None)
+    return _frozen(pi)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE * 4)
+def turn_distribution(board_size, moves):
+    """where a player starting on tile 0 stands after moves moves"""
+    if board_size <= DENSE_LIMIT:
+        return _frozen(np.linalg.matrix_power(transition_matrix(board_size), moves)[0].copy())
+    # a long ring: the sums of moves dice only cover 2*moves..12*moves
+    distribution = np.ones(1)
+    for _ in range(moves):
+        distribution = np.convolve(distribution, DICE)
+    return _frozen(_wrap(distribution, board_size))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def expected_visits(board_size, moves=MOVES):
+    """landings per tile of a player starting on tile 0 in moves moves"""
+    if board_size <= DENSE_LIMIT:
+        matrix = transition_matrix(board_size)
+        visits = np.zeros(board_size)
+        distribution = np.zeros(board_size)
+        distribution[0] = 1
+        for _ in range(moves):
+            distribution = distribution @ matrix
+            visits += distribution
+        return _frozen(visits)
+    # summed along the unrolled ring, folded once at the end
+    visits = np.zeros((len(DICE) - 1) * moves + 1)
+    distribution = np.ones(1)
+    for _ in range(moves):
+        distribution = np.convolve(distribution, DICE)
+        visits[:len(distribution)] += distribution
+    return _frozen(_wrap(visits, board_size))
+
+
+def _step_back(values):
+    """expected value at the landing tile of one move, from every tile"""
+    return sum(p * np.roll(values, -dice) for dice, p in enumerate(DICE) if p)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def first_visits(board_size, moves=MOVES):
+    """F[k, j], probability that a player from tile 0 lands on j for the
+    first time on move k + 1"""
+    if board_size > DENSE_LIMIT:
+        raise ValueError(f"no first visit table past {DENSE_LIMIT} tiles")
+    # on a circulant ring reaching j from 0 is reaching 0 from -j, so one
+    # backward pass towards tile 0 answers for every tile at once
+    hits = np.zeros((moves, board_size))
+    target = np.zeros(board_size)
+    target[0] = 1
+    for k in range(moves):
+        hits[k] = _step_back(target)
+        # landing on 0 earlier means the next landing is not the first
+        target = hits[k].copy()
+        target[0] = 0
+    return _frozen(hits[:, -np.arange(board_size) % board_size])
+
+
+def landing_probability(board_size, moves, tile, start=0):
+    """probability of standing on tile after moves moves from start"""
+    return turn_distribution(board_size, moves)[(tile - start) % board_size]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="landing probabilities of the 2d6 ring")
+    parser.add_argument("--size", type=int, default=20)
+    parser.add_argument("--moves", type=int, default=MOVES)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    visits = expected_visits(args.size, args.moves)
+    logging.info("%d tiles, %d moves in %.3f s", args.size, args.moves, time.perf_counter() - start)
+    for tile in np.argsort(visits)[::-1][:args.top]:
+        print(f"tile {tile:>6}: {visits[tile]:.3f} landings")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
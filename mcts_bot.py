@@ -0,0 +1,228 @@
+"""monte carlo tree search bot
+
+Picks the popup option (buy, rent, auction, pass) by playing the game
+forward many times from the current state. The tree is open loop: a node
+is a sequence of the bot's own decisions, dice and opponent moves are
+sampled again on every iteration and the opponent plays the cautious
+strategy.
+
+The FSM never runs the search on the render task. A thinker runs it in
+a worker process and the FSM polls it once per frame; in the pygbag
+build, where there are no processes, the search runs a few milliseconds
+per frame instead. Either way the answer comes back within the budget.
+"""
+import concurrent.futures
+import copy
+import logging
+import math
+import multiprocessing
+import random
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from bot_strategies import CautiousStrategy
+from game_rules import AUCTION, ACTORS
+
+EXPLORATION = 1.4
+# turns simulated after the decision before the state is scored
+ROLLOUT_TURNS = 40
+# gold difference that counts as a sure win when a rollout is cut short
+WORTH_SCALE = 200
+# search time per frame when running on the render task
+FRAME_SLICE = 0.004
+# extra time given to the worker process before falling back
+GRACE = 0.25
+
+
+class Node:
+    """statistics of one sequence of decisions"""
+    __slots__ = ("visits", "value", "children")
+
+    def __init__(self):
+        self.visits = 0
+        self.value = 0.0
+        self.children = {}
+
+    def select(self, options):
+        """returns (option, created): untried options first, then UCB1"""
+        for option in options:
+            if option not in self.children:
+                self.children[option] = Node()
+                return option, True
+        log_visits = math.log(self.visits)
+
+        def ucb(option):
+            child = self.children[option]
+            return child.value / child.visits + EXPLORATION * math.sqrt(log_visits / child.visits)
+
+        return max(options, key=ucb), False
+
+
+class MctsSearch:
+    """search rooted at the popup of the actor that just moved"""
+
+    def __init__(self, rules, state, rng=None):
+        # the search draws its own dice, the game rng is left untouched
+        self.rules = copy.copy(rules)
+        self.rules.rng = rng or random.Random()
+        self.state = state.copy()
+        self.me = state.actor
+        self.options = rules.options(state)
+        self.policy = CautiousStrategy()
+        self.root = Node()
+        self.iterations = 0
+
+    def run_until(self, deadline):
+        """iterates until the perf_counter deadline"""
+        if len(self.options) == 1:
+            return
+        while time.perf_counter() < deadline:
+            self.iterate()
+
+    def best(self):
+        """most visited option, the rollout policy if nothing was searched"""
+        if not self.root.children:
+            return self.policy.decide(self.rules, self.state)
+        return max(self.root.children, key=lambda option: self.root.children[option].visits)
+
+    def iterate(self):
+        rules, state = self.rules, self.state.copy()
+        node, path = self.root, [self.root]
+        in_tree = True
+        options = self.options
+        turns = 0
+
+        while True:
+            if state.actor == self.me and in_tree and len(options) > 1:
+                choice, created = node.select(options)
+                node = node.children[choice]
+                path.append(node)
+                # leave the tree after adding one node
+                in_tree = not created
+            else:
+                choice = self.policy.decide(rules, state)
+            bids = None
+            if choice == AUCTION:
+                bids = {actor: self.policy.bid(rules, state, actor) for actor in ACTORS}
+            rules.resolve(state, choice, bids)
+            rules.end_turn(state)
+
+            turns += 1
+            if turns >= ROLLOUT_TURNS or not rules.advance(state):
+                break
+            options = rules.options(state)
+
+        reward = self.reward(state)
+        for visited in path:
+            visited.visits += 1
+            visited.value += reward
+        self.iterations += 1
+
+    def reward(self, state):
+        """1 for a win, 0 for a loss, the worth difference when cut short"""
+        if state.over:
+            winner = state.winner
+            if winner is None:
+                return 0.5
+            return 1.0 if winner == self.me else 0.0
+
+        def worth(actor):
+            return state.inventories[actor]["money"] + state.ledger.worth(actor)
+
+        other = ACTORS[1] if self.me == ACTORS[0] else ACTORS[0]
+        return 0.5 + 0.5 * math.tanh((worth(self.me) - worth(other)) / WORTH_SCALE)
+
+
+def search(rules, state, budget, seed=None):
+    """runs a search for budget seconds and returns the chosen option"""
+    mcts = MctsSearch(rules, state, random.Random(seed))
+    mcts.run_until(time.perf_counter() + budget)
+    return mcts.best()
+
+
+def _warm_up():
+    return True
+
+
+class ProcessThinker:
+    """runs the search in a worker process, poll() never blocks"""
+
+    def __init__(self):
+        self.executor = None
+        self._restart()
+        self.future = None
+        self.deadline = 0
+        self.fallback = None
+
+    def _restart(self):
+        """a new worker process, a running search of the old one ends on its own"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        # spawn, a forked copy of a process holding a GL context is not safe
+        self.executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self.executor.submit(_warm_up)
+
+    def start(self, rules, state, budget):
+        self.fallback = CautiousStrategy().decide(rules, state)
+        self.deadline = time.perf_counter() + budget + GRACE
+        try:
+            # the journal and the recorder hold open files, a copy drops them
+            self.future = self.executor.submit(search, rules, state.copy(), budget)
+        except BrokenProcessPool:
+            logging.exception("mcts worker is gone, playing the cautious pick")
+            self._restart()
+            self.future = concurrent.futures.Future()
+            self.future.set_result(self.fallback)
+
+    def poll(self):
+        """the chosen option, or None while the worker is thinking"""
+        if self.future.done():
+            try:
+                return self.future.result()
+            except Exception as error:
+                logging.exception("mcts worker failed, playing the cautious pick")
+                if isinstance(error, BrokenProcessPool):
+                    self._restart()
+                return self.fallback
+        if time.perf_counter() > self.deadline:
+            # hard budget: a stuck worker never stalls the turn, and a
+            # running search cannot be cancelled, the next one would queue
+            # behind it
+            if not self.future.cancel():
+                self._restart()
+            return self.fallback
+        return None
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SlicedThinker:
+    """searches FRAME_SLICE seconds per poll, for builds without processes"""
+
+    def __init__(self):
+        self.search = None
+        self.deadline = 0
+
+    def start(self, rules, state, budget):
+        self.search = MctsSearch(rules, state)
+        self.deadline = time.perf_counter() + budget
+
+    def poll(self):
+        now = time.perf_counter()
+        if now >= self.deadline or len(self.search.options) == 1:
+            return self.search.best()
+        self.search.run_until(min(now + FRAME_SLICE, self.deadline))
+        return None
+
+    def shutdown(self):
+        self.search = None
+
+
+def make_thinker():
+    """worker process on desktop, frame slices in the browser"""
+    if sys.platform == "emscripten":
+        return SlicedThinker()
+    return ProcessThinker()
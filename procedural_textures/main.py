@@ -1,29 +1,249 @@
-from PIL import Image, ImageDraw, ImageFilter
+"""procedural textures
 
-# Dimensions
-WIDTH, HEIGHT = 1024, 600
+Every generated asset is listed in TEXTURES with the generator that draws
+it and its parameters. Generators work on whole NumPy arrays, never pixel
+by pixel, and the textures are drawn in parallel worker processes.
 
-# Create base image (woodgrain background)
-bg = Image.new("RGB", (WIDTH, HEIGHT), (60, 30, 20))  # deep brown wood
+A manifest keeps the hash of the parameters each file was drawn with, so
+only new, missing or changed textures are drawn again:
 
-# Optional: draw vertical stripes to mimic woodgrain
-draw = ImageDraw.Draw(bg)
-for x in range(0, WIDTH, 40):
-    draw.line([(x, 0), (x, HEIGHT)], fill=(70, 35, 25), width=2)
+    python procedural_textures/main.py            # what changed
+    python procedural_textures/main.py --force    # everything
+    python procedural_textures/main.py assets/forest.png
 
-# Add parchment panel
-MARGIN = 60
-parchment = Image.new("RGB", (WIDTH - 2*MARGIN, HEIGHT - 2*MARGIN), (240, 228, 210))
-bg.paste(parchment, (MARGIN, MARGIN))
+The game calls ensure_textures() at startup to draw the missing ones.
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
 
-# Add feathered edge using mask
-mask = Image.new("L", (WIDTH, HEIGHT), 255)
-edge = ImageDraw.Draw(mask)
-edge.rectangle((MARGIN-10, MARGIN-10, WIDTH-MARGIN+10, HEIGHT-MARGIN+10), fill=0)
-mask = mask.filter(ImageFilter.GaussianBlur(8))
-bg.putalpha(mask)
+import numpy as np
+from PIL import Image
 
-# Save or preview
-bg = bg.convert("RGB")
-bg.save("monopoly_panel.png")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFEST = os.path.join(ROOT, "procedural_textures", "manifest.json")
+# bump when a generator draws something else for the same parameters
+VERSION = 1
 
+
+def value_noise(rng, height, width, cells):
+    """smooth noise in [0, 1], a random lattice of cells x cells interpolated"""
+    lattice = rng.random((cells + 1, cells + 1))
+    y = np.linspace(0, cells, height, endpoint=False)
+    x = np.linspace(0, cells, width, endpoint=False)
+    y0, x0 = y.astype(int), x.astype(int)
+    # smoothstep weights
+    ty, tx = y - y0, x - x0
+    ty, tx = (ty * ty * (3 - 2 * ty))[:, None], (tx * tx * (3 - 2 * tx))[None, :]
+    top = lattice[y0][:, x0] * (1 - tx) + lattice[y0][:, x0 + 1] * tx
+    bottom = lattice[y0 + 1][:, x0] * (1 - tx) + lattice[y0 + 1][:, x0 + 1] * tx
+    return top * (1 - ty) + bottom * ty
+
+
+def fbm(rng, height, width, cells=4, octaves=4):
+    """octaves of value noise, each twice as fine and half as strong"""
+    total = np.zeros((height, width))
+    amplitude, norm = 1.0, 0.0
+    for octave in range(octaves):
+        total += value_noise(rng, height, width, cells * 2 ** octave) * amplitude
+        norm += amplitude
+        amplitude /= 2
+    return total / norm
+
+
+def shade(palette, values):
+    """maps values in [0, 1] onto a list of RGB stops"""
+    stops = np.asarray(palette, dtype=float)
+    positions = np.linspace(0, 1, len(stops))
+    return np.stack([np.interp(values, positions, stops[:, c]) for c in range(3)], axis=-1)
+
+
+def to_image(rgb):
+    return np.clip(np.rint(rgb), 0, 255).astype(np.uint8)
+
+
+def panel(params):
+    """wood background with stripes and a parchment panel, the action card"""
+    width, height = params["size"]
+    image = np.empty((height, width, 3))
+    image[:] = params["wood"]
+    rows = (np.arange(height) - params["stripe_offset"]) % params["stripe_period"] < params["stripe_width"]
+    image[rows] = params["stripe"]
+    margin = params["margin"]
+    image[margin:height - margin, margin:width - margin] = params["parchment"]
+    return to_image(image)
+
+
+def pond(params):
+    """the left lane: dark water, ripple rings and a few lily pads"""
+    width, height = params["size"]
+    rng = np.random.default_rng(params["seed"])
+    water = fbm(rng, height, width, cells=3)
+
+    y, x = np.mgrid[0:height, 0:width]
+    centers = rng.random((params["ripples"], 2)) * (height, width)
+    distance = np.hypot(y[None] - centers[:, 0, None, None], x[None] - centers[:, 1, None, None])
+    rings = (np.sin(distance / params["ring_spacing"] * 2 * np.pi) * np.exp(-distance / params["ring_fade"])).sum(axis=0)
+    image = shade(params["water"], np.clip(water + 0.15 * rings, 0, 1))
+
+    pads = rng.random((params["pads"], 3)) * (height, width, 1)
+    for py, px, angle in pads:
+        radius = params["pad_radius"] * (0.6 + 0.4 * angle)
+        dy, dx = y - py, x - px
+        # a disc with a notch cut out of it
+        inside = dy * dy + dx * dx < radius * radius
+        notch = np.abs(np.arctan2(dy, dx) - (angle * 4 - 2)) < 0.3
+        mask = inside & ~notch
+        image[mask] = np.asarray(params["pad"]) * (0.8 + 0.4 * water[mask, None])
+    return to_image(image)
+
+
+def forest(params):
+    """the right lane: tree canopies seen from above over the undergrowth"""
+    width, height = params["size"]
+    rng = np.random.default_rng(params["seed"])
+    ground = fbm(rng, height, width, cells=4)
+
+    # distance to the nearest trunk, brighter at the middle of each crown
+    trunks = rng.random((params["trees"], 2)) * (height, width)
+    y, x = np.mgrid[0:height, 0:width]
+    nearest = np.full((height, width), np.inf)
+    for ty, tx in trunks:
+        np.minimum(nearest, np.hypot(y - ty, x - tx), out=nearest)
+    crown = np.clip(1 - nearest / params["crown_radius"], 0, 1)
+
+    light = np.clip(0.55 * crown + 0.45 * ground, 0, 1)
+    return to_image(shade(params["leaves"], light))
+
+
+def tile(params):
+    """grey card face, the lanes tint it with the card color"""
+    width, height = params["size"]
+    y, x = np.mgrid[0:height, 0:width]
+    # distance to the closest edge, in pixels
+    edge = np.minimum.reduce([x, y, width - 1 - x, height - 1 - y])
+    face = params["face"] - params["gradient"] * y / height
+    value = np.where(edge < params["border"], params["rim"], face)
+    return to_image(np.repeat(value[..., None], 3, axis=-1))
+
+
+GENERATORS = {
+    "panel": panel,
+    "pond": pond,
+    "forest": forest,
+    "tile": tile,
+}
+
+# output path (from the repo root) -> (generator, parameters)
+TEXTURES = {
+    "assets/monopoly_panel.png": ("panel", {
+        "size": (600, 1024), "wood": (60, 30, 20), "stripe": (70, 35, 25),
+        "stripe_period": 40, "stripe_offset": 22, "stripe_width": 2,
+        "margin": 60, "parchment": (240, 228, 210),
+    }),
+    "assets/stagno.png": ("pond", {
+        "size": (512, 512), "seed": 7,
+        "water": [(4, 28, 38), (6, 52, 66), (22, 84, 92)],
+        "ripples": 6, "ring_spacing": 14, "ring_fade": 60,
+        "pads": 9, "pad_radius": 26, "pad": (46, 104, 52),
+    }),
+    "assets/forest.png": ("forest", {
+        "size": (512, 512), "seed": 11, "trees": 40, "crown_radius": 70,
+        "leaves": [(10, 30, 14), (28, 70, 30), (78, 128, 56)],
+    }),
+    "assets/tile.png": ("tile", {
+        "size": (256, 256), "face": 255, "gradient": 40, "rim": 170, "border": 6,
+    }),
+}
+
+
+def params_hash(generator, params):
+    text = json.dumps([VERSION, generator, params], sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest):
+    with open(MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def render(path):
+    """draws one texture, returns (path, params hash, seconds)"""
+    start = time.perf_counter()
+    generator, params = TEXTURES[path]
+    Image.fromarray(GENERATORS[generator](params)).save(os.path.join(ROOT, path))
+    return path, params_hash(generator, params), time.perf_counter() - start
+
+
+def stale(paths=None, force=False):
+    """textures missing on disk or drawn with other parameters"""
+    manifest = load_manifest()
+    result = []
+    for path in paths or TEXTURES:
+        generator, params = TEXTURES[path]
+        if (force or not os.path.exists(os.path.join(ROOT, path))
+                or manifest.get(path) != params_hash(generator, params)):
+            result.append(path)
+    return result
+
+
+def build(paths, workers=None):
+    """draws the textures, in worker processes when there is more than one"""
+    if not paths:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers == 1 or sys.platform == "emscripten":
+        results = [render(path) for path in paths]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(render, paths))
+
+    manifest = load_manifest()
+    for path, digest, seconds in results:
+        manifest[path] = digest
+        logging.info("drew %s in %.2f s", path, seconds)
+    save_manifest(manifest)
+    return [path for path, _, _ in results]
+
+
+def ensure_textures():
+    """draws the textures missing on disk, in process, used at game startup"""
+    missing = [path for path in TEXTURES if not os.path.exists(os.path.join(ROOT, path))]
+    return build(missing, workers=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="draw the procedural textures")
+    parser.add_argument("paths", nargs="*", metavar="path",
+                        help="textures to draw, all of them by default")
+    parser.add_argument("--force", action="store_true", help="draw them even when up to date")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    unknown = [path for path in args.paths if path not in TEXTURES]
+    if unknown:
+        parser.error(f"unknown textures {', '.join(unknown)}, pick from {', '.join(TEXTURES)}")
+
+    start = time.perf_counter()
+    paths = stale(args.paths, args.force)
+    built = build(paths, args.workers)
+    logging.info("%d of %d textures drawn in %.2f s",
+                 len(built), len(args.paths or TEXTURES), time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
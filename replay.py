@@ -0,0 +1,252 @@
+"""seeded streams and replays
+
+Every subsystem draws from its own random stream, derived from one seed:
+the dice, the board, the inventory (powers), the bot strategies, the title
+lasers and the dice flashes. Drawing more lasers or a random bot pick never
+changes the dice, and a game is reproduced by its seed and the decisions
+taken on the popups.
+
+A replay file holds, for each game, its seed and settings, the decision of
+every turn and a keyframe every KEYFRAME_INTERVAL turns: positions, gold,
+powers, the purchases and the state of the dice stream. Seeking to turn N
+starts from the closest keyframe before it and plays the few turns left
+with the headless rules, no animation runs:
+
+    SEED=7 RECORD=game.replay python main.py
+    REPLAY=game.replay REPLAY_TURN=57 python main.py
+    python replay.py game.replay --turn 57
+"""
+import argparse
+import hashlib
+import logging
+import random
+import struct
+import time
+from array import array
+
+from board import LAZY_THRESHOLD
+from fair_board import find_fair_board
+from game_rules import (
+    ACTORS, AUCTION, BUY, HUMAN, BOT, PASS, POWERS, RENT, GameRules
+)
+
+STREAMS = ("games", "dice", "board", "inventory", "strategy", "lasers", "flashes")
+MAGIC = b"MRPL"
+VERSION = 2
+# turns between two keyframes
+KEYFRAME_INTERVAL = 10
+CHOICES = (BUY, RENT, AUCTION, PASS)
+NO_ACTOR = 255
+
+GAME = 1
+DECISION = 2
+KEYFRAME = 3
+TAG = struct.Struct("<B")
+# seed, board size, fair board candidates, power bonus, cheaper upgrades,
+# starting money, max turns
+GAME_RECORD = struct.Struct("<QIIIIII")
+# turn, choice, human bid, bot bid
+DECISION_RECORD = struct.Struct("<IBii")
+# turn, actor, loser, finished, positions, gold, powers, dice, purchases;
+# followed by the tiles bought, their owners and the dice stream
+KEYFRAME_RECORD = struct.Struct("<IBBBiiiiBBBBI")
+# a tile index and an owner code per purchase
+PURCHASE_SIZE = 5
+RNG_STATE = struct.Struct("<625I")
+
+
+def stream_seed(seed, name):
+    """seed of one stream, unrelated to the seeds of the others"""
+    digest = hashlib.sha256(f"{seed}:{name}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+class RngStreams:
+    """a random.Random per subsystem, named after STREAMS"""
+
+    def __init__(self, seed):
+        self.seed = seed
+        for name in STREAMS:
+            setattr(self, name, random.Random(stream_seed(seed, name)))
+
+
+def new_game(rules, game_seed, fair_candidates=0, board=None):
+    """seeds the rules for one game and deals it, the same way when
+    playing and when replaying; board skips drawing it again"""
+    streams = RngStreams(game_seed)
+    rules.rng = streams.dice
+    rules.board_rng = streams.board
+    rules.inventory_rng = streams.inventory
+    if board is None and fair_candidates and rules.board_size <= LAZY_THRESHOLD:
+        # scored in process, forking the window would copy its GL context
+        board, details = find_fair_board(
+            rules.board_size, fair_candidates, base_seed=rules.board_rng.getrandbits(32), workers=1)
+        logging.info("fair board %d: score %.4f", details["seed"], details["score"])
+    return rules.new_game(board)
+
+
+class Recorder:
+    """writes the replay of the games attached to it"""
+
+    def __init__(self, path, interval=KEYFRAME_INTERVAL):
+        self.interval = interval
+        self.file = open(path, "wb")
+        self.file.write(MAGIC + bytes([VERSION]))
+
+    def attach(self, state, rules, game_seed, fair_candidates=0):
+        state.recorder = self
+        self.file.write(TAG.pack(GAME) + GAME_RECORD.pack(
+            game_seed, rules.board_size, fair_candidates, rules.power_bonus,
+            rules.power_cheaper_upgrades, rules.starting_money, rules.max_turns))
+
+    def decision(self, state, choice, bids):
+        bids = bids or {}
+        self.file.write(TAG.pack(DECISION) + DECISION_RECORD.pack(
+            state.turn, CHOICES.index(choice), bids.get(HUMAN, 0), bids.get(BOT, 0)))
+
+    def turn_done(self, state, rules):
+        if state.turn % self.interval == 0:
+            self.file.write(TAG.pack(KEYFRAME) + keyframe(state, rules))
+        if state.over:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def keyframe(state, rules):
+    """bytes of a keyframe, as large as the purchases and not the board"""
+    ledger = state.ledger
+    purchases = array("I", ledger.bought).tobytes() + bytes(ledger.owners[index] for index in ledger.bought)
+    inventories = [state.inventories[actor] for actor in ACTORS]
+    return KEYFRAME_RECORD.pack(
+        state.turn, ACTORS.index(state.actor),
+        ACTORS.index(state.loser) if state.loser else NO_ACTOR, state.finished,
+        *(state.positions[actor] for actor in ACTORS),
+        *(inventory["money"] for inventory in inventories),
+        *(POWERS.index(inventory["power"]) for inventory in inventories),
+        *state.dice, len(ledger.bought)) + purchases + RNG_STATE.pack(*rules.rng.getstate()[1])
+
+
+def restore(state, rules, data):
+    """puts a keyframe into a freshly dealt state of the same game"""
+    (turn, actor, loser, finished, human_position, bot_position, human_money, bot_money,
+     human_power, bot_power, d1, d2, purchases) = KEYFRAME_RECORD.unpack_from(data)
+    offset = KEYFRAME_RECORD.size
+    indexes = array("I")
+    indexes.frombytes(data[offset:offset + 4 * purchases])
+    codes = data[offset + 4 * purchases:offset + PURCHASE_SIZE * purchases]
+    rng_state = RNG_STATE.unpack_from(data, offset + PURCHASE_SIZE * purchases)
+
+    state.turn = turn
+    state.actor = ACTORS[actor]
+    state.loser = None if loser == NO_ACTOR else ACTORS[loser]
+    state.finished = bool(finished)
+    state.positions = {HUMAN: human_position, BOT: bot_position}
+    for name, money, power in ((HUMAN, human_money, human_power), (BOT, bot_money, bot_power)):
+        state.inventories[name]["money"] = money
+        state.inventories[name]["power"] = POWERS[power]
+    state.dice = (d1, d2)
+    # assigned again in order so the ledger counts groups and worth
+    for index, code in zip(indexes, codes):
+        state.ledger.assign(index, ACTORS[code])
+    rules.rng.setstate((3, rng_state, None))
+
+
+class ReplayGame:
+    """one game of a replay file"""
+
+    def __init__(self, seed, board_size, fair_candidates, power_bonus,
+                 power_cheaper_upgrades, starting_money, max_turns):
+        self.seed = seed
+        self.board_size = board_size
+        self.fair_candidates = fair_candidates
+        self.settings = {
+            "board_size": board_size, "power_bonus": power_bonus,
+            "power_cheaper_upgrades": power_cheaper_upgrades,
+            "starting_money": starting_money, "max_turns": max_turns,
+        }
+        # turn -> (choice, bids), turn -> keyframe bytes
+        self.decisions = {}
+        self.keyframes = {}
+        # dealt on the first seek, a fair board takes a while to find
+        self.board = None
+
+    @property
+    def turns(self):
+        return max(self.decisions, default=0)
+
+    def seek(self, turn):
+        """(rules, state) once turn is over, from the closest keyframe"""
+        rules = GameRules(**self.settings)
+        state = new_game(rules, self.seed, self.fair_candidates, self.board)
+        self.board = state.board
+        start = max((t for t in self.keyframes if t <= turn), default=None)
+        if start is not None:
+            restore(state, rules, self.keyframes[start])
+        while state.turn < turn and rules.advance(state):
+            choice, bids = self.decisions.get(state.turn, (PASS, None))
+            rules.resolve(state, choice, bids)
+            rules.end_turn(state)
+        return rules, state
+
+
+def read_replay(path):
+    """the ReplayGames of a file, a torn last record is dropped"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a replay")
+    if data[len(MAGIC)] != VERSION:
+        raise ValueError(f"{path} is replay version {data[len(MAGIC)]}, not {VERSION}")
+
+    games = []
+    offset = len(MAGIC) + 1
+    try:
+        while offset < len(data):
+            (tag,) = TAG.unpack_from(data, offset)
+            offset += TAG.size
+            if tag == GAME:
+                games.append(ReplayGame(*GAME_RECORD.unpack_from(data, offset)))
+                offset += GAME_RECORD.size
+            elif tag == DECISION:
+                turn, choice, human_bid, bot_bid = DECISION_RECORD.unpack_from(data, offset)
+                games[-1].decisions[turn] = (CHOICES[choice], {HUMAN: human_bid, BOT: bot_bid})
+                offset += DECISION_RECORD.size
+            elif tag == KEYFRAME:
+                fields = KEYFRAME_RECORD.unpack_from(data, offset)
+                turn, purchases = fields[0], fields[-1]
+                end = offset + KEYFRAME_RECORD.size + PURCHASE_SIZE * purchases + RNG_STATE.size
+                if end > len(data):
+                    break
+                games[-1].keyframes[turn] = data[offset:end]
+                offset = end
+            else:
+                raise ValueError(f"unknown record {tag} at byte {offset - 1} of {path}")
+    except struct.error:
+        logging.info("%s ends with a torn record", path)
+    return games
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="jump to a turn of a replay")
+    parser.add_argument("path")
+    parser.add_argument("--game", type=int, default=0)
+    parser.add_argument("--turn", type=int, default=None, help="the last turn by default")
+    args = parser.parse_args(argv)
+
+    games = read_replay(args.path)
+    game = games[args.game]
+    turn = game.turns if args.turn is None else args.turn
+    start = time.perf_counter()
+    _, state = game.seek(turn)
+    logging.info("game %d of %d, seed %d: turn %d reached in %.1f ms",
+                 args.game, len(games), game.seed, state.turn, (time.perf_counter() - start) * 1e3)
+    print(f"actor {state.actor}, positions {state.positions}, dice {state.dice}")
+    for actor in ACTORS:
+        print(f"{actor}: {state.inventories[actor]}, {state.ledger.count(actor)} cards")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
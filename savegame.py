@@ -0,0 +1,219 @@
+"""save and load a running game
+
+A save is the last snapshot of the game (see snapshots.py) in a versioned
+binary format: the settings, turn, actor, positions, gold and powers, the
+board, the purchases in the order they were made and the dice stream. A
+20 card board takes about 3.1 kB, 2.5 kB of which is the dice stream.
+
+A Board is written array by array, a LazyBoard is only its size and seed.
+
+Snapshots are immutable, so the render task takes one and a worker thread
+packs and writes it. The browser build has no threads and a small, slow
+localStorage: the save is packed inline and stored base64 encoded under
+the name of the file.
+
+    F5 saves to SAVE_FILE, F6 loads it back on the human turn
+    LOAD=1 python main.py          # starts on the saved game
+    python savegame.py monopoly.save
+"""
+import argparse
+import base64
+import concurrent.futures
+import logging
+import os
+import platform
+import struct
+import sys
+import time
+from array import array
+
+from board import Board, LazyBoard
+from game_rules import ACTORS, HUMAN, BOT, POWERS, GameRules, GameState
+from replay import RNG_STATE
+
+MAGIC = b"MSAV"
+VERSION = 1
+NO_ACTOR = 255
+NO_POWER = 255
+
+# board size, power bonus, cheaper upgrades, starting money, max turns,
+# turn, actor, loser, finished, positions, gold, powers, dice, lazy board,
+# purchases
+SAVE_RECORD = struct.Struct("<IIIIIIBBBiiiiBBBBBI")
+# cards, palette floats, bytes of the names; followed by the types,
+# prices, groups, name ids, palette and the names separated by newlines
+BOARD_RECORD = struct.Struct("<III")
+# size, seed
+LAZY_RECORD = struct.Struct("<QQ")
+SEPARATOR = "\n"
+
+
+def pack(snapshot, rules):
+    """the bytes of a save, from a snapshot taken with the dice stream"""
+    if snapshot.rng_words is None:
+        raise ValueError("the snapshot has no dice stream")
+    board = snapshot.board
+    lazy = isinstance(board, LazyBoard)
+    purchases = snapshot.purchase_list()
+    parts = [MAGIC, bytes([VERSION]), SAVE_RECORD.pack(
+        rules.board_size, rules.power_bonus, rules.power_cheaper_upgrades,
+        rules.starting_money, rules.max_turns,
+        snapshot.turn, ACTORS.index(snapshot.actor),
+        ACTORS.index(snapshot.loser) if snapshot.loser else NO_ACTOR, snapshot.finished,
+        *snapshot.positions,
+        *(money for _, money in snapshot.inventories),
+        *(POWERS.index(power) if power else NO_POWER for power, _ in snapshot.inventories),
+        *snapshot.dice, lazy, len(purchases))]
+
+    if lazy:
+        parts.append(LAZY_RECORD.pack(board.size, board.seed))
+    else:
+        names = SEPARATOR.join(board.name_table).encode()
+        parts += [BOARD_RECORD.pack(len(board), len(board.palette), len(names)),
+                  board.types, board.prices, board.groups, board.name_ids, board.palette, names]
+
+    parts += [array("I", [index for index, _ in purchases]),
+              bytes(code for _, code in purchases),
+              RNG_STATE.pack(*snapshot.rng_words, snapshot.rng_index)]
+    return b"".join(parts)
+
+
+def unpack(data):
+    """(rules, state) of a save, the dice stream of rules is restored;
+    ValueError when the data is not a whole save"""
+    try:
+        return _unpack(data)
+    except (struct.error, IndexError) as error:
+        raise ValueError(f"truncated save: {error}") from error
+
+
+def _unpack(data):
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a save")
+    if data[len(MAGIC)] != VERSION:
+        raise ValueError(f"save version {data[len(MAGIC)]}, not {VERSION}")
+    offset = len(MAGIC) + 1
+
+    (board_size, power_bonus, power_cheaper_upgrades, starting_money, max_turns,
+     turn, actor, loser, finished, human_position, bot_position, human_money, bot_money,
+     human_power, bot_power, d1, d2, lazy, purchases) = SAVE_RECORD.unpack_from(data, offset)
+    offset += SAVE_RECORD.size
+
+    def take(typecode, count):
+        nonlocal offset
+        values = array(typecode)
+        end = offset + count * values.itemsize
+        values.frombytes(data[offset:end])
+        offset = end
+        return values
+
+    if lazy:
+        board = LazyBoard(*LAZY_RECORD.unpack_from(data, offset))
+        offset += LAZY_RECORD.size
+    else:
+        cards, palette, names = BOARD_RECORD.unpack_from(data, offset)
+        offset += BOARD_RECORD.size
+        types, prices, groups, name_ids = (take(typecode, cards) for typecode in "BHhH")
+        palette = take("f", palette)
+        name_table = data[offset:offset + names].decode().split(SEPARATOR)
+        offset += names
+        board = Board.from_arrays(types, prices, groups, name_ids, name_table, palette)
+
+    indexes = take("I", purchases)
+    codes = data[offset:offset + purchases]
+    offset += purchases
+    rng_state = RNG_STATE.unpack_from(data, offset)
+
+    inventories = {
+        name: {"power": None if power == NO_POWER else POWERS[power], "money": money, "cards": [{}]}
+        for name, money, power in ((HUMAN, human_money, human_power), (BOT, bot_money, bot_power))
+    }
+    state = GameState(board, inventories, ACTORS[actor], turn)
+    state.positions = {HUMAN: human_position, BOT: bot_position}
+    state.dice = (d1, d2)
+    state.loser = None if loser == NO_ACTOR else ACTORS[loser]
+    state.finished = bool(finished)
+    for index, code in zip(indexes, codes):
+        state.ledger.assign(index, ACTORS[code])
+
+    rules = GameRules(board_size=board_size, power_bonus=power_bonus,
+                      power_cheaper_upgrades=power_cheaper_upgrades,
+                      starting_money=starting_money, max_turns=max_turns)
+    rules.rng.setstate((3, rng_state, None))
+    return rules, state
+
+
+def write_save(path, data):
+    """writes the file whole or not at all, localStorage in the browser"""
+    if sys.platform == "emscripten":
+        platform.window.localStorage.setItem(path, base64.b64encode(data).decode())
+        return
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def read_save(path):
+    if sys.platform == "emscripten":
+        text = platform.window.localStorage.getItem(path)
+        if text is None:
+            raise FileNotFoundError(path)
+        return base64.b64decode(text)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class Saver:
+    """saves off the render task, one at a time and in order"""
+
+    def __init__(self, path, threaded=sys.platform != "emscripten"):
+        self.path = path
+        self.executor = None
+        if threaded:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="save")
+        self.pending = None
+
+    def save(self, snapshot, rules):
+        if self.executor is None:
+            self._write(snapshot, rules)
+        else:
+            self.pending = self.executor.submit(self._write, snapshot, rules)
+
+    def _write(self, snapshot, rules):
+        start = time.perf_counter()
+        data = pack(snapshot, rules)
+        packed = time.perf_counter()
+        write_save(self.path, data)
+        logging.info("turn %d saved to %s: %d bytes, packed in %.3f ms, written in %.3f ms",
+                     snapshot.turn, self.path, len(data), (packed - start) * 1e3,
+                     (time.perf_counter() - packed) * 1e3)
+
+    def load(self):
+        """(rules, state) of the save, once the pending save is written"""
+        if self.pending is not None:
+            self.pending.result()
+        return unpack(read_save(self.path))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="print a saved game")
+    parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    data = read_save(args.path)
+    start = time.perf_counter()
+    _, state = unpack(data)
+    logging.info("%d bytes loaded in %.3f ms", len(data), (time.perf_counter() - start) * 1e3)
+    print(f"turn {state.turn}, actor {state.actor}, positions {state.positions}, dice {state.dice}")
+    for actor in ACTORS:
+        print(f"{actor}: {state.inventories[actor]}, {state.ledger.count(actor)} cards")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
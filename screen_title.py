@@ -4,7 +4,11 @@ from direct.gui.OnscreenImage import OnscreenImage
 from direct.gui.OnscreenText import OnscreenText
 from direct.task import Task
 from direct.interval.IntervalGlobal import LerpColorScaleInterval, Sequence, Func
-from panda3d.core import TransparencyAttrib, TextNode, LineSegs, NodePath, ColorBlendAttrib, LColor
+from panda3d.core import (
+    TransparencyAttrib, TextNode, LineSegs, NodePath, ColorBlendAttrib, LColor,
+    Geom, GeomLines, GeomNode, GeomVertexData, GeomVertexFormat, GeomVertexWriter
+)
+from asset_cache import BOLD_FONT
 import random
 import sys
 from math import sin
@@ -26,10 +30,10 @@ class TitleScreen(DirectObject):
 
         # Set 2D aspect render
         self.base.setBackgroundColor(0, 0, 0)
-        bg = OnscreenImage(parent=self.base.render2d, image="assets/bg_fill.png")
+        bg = OnscreenImage(parent=self.base.render2d, image=self.base.assets.texture("assets/bg_fill.png"))
         bg.setTransparency(TransparencyAttrib.MAlpha)
 
-        self.bold_font = self.base.loader.loadFont("assets/fonts/Orbitron/static/Orbitron-Bold.ttf")
+        self.bold_font = self.base.assets.font(BOLD_FONT)
         self.title = "FROGS vs\nHEDGEHOGS"
 
         # Add noisy red text
@@ -38,10 +42,14 @@ class TitleScreen(DirectObject):
         # Add press enter to start
         self.create_press_enter()
 
-        self.lasers = LaserField(self.base.render2d, num_lines=5)
+        self.lasers = LaserField(self.base.render2d, num_lines=5, rng=self.base.streams.lasers)
         self.base.taskMgr.doMethodLater(0.2, self.lasers.animate, "LaserUpdateTask")
         self.base.taskMgr.add(self.pulse_text, "PulseTextTask")
 
+        # load what comes next while the title animates
+        self.base.assets.preload_screen("settings")
+        self.base.assets.preload_screen("game")
+
     def create_press_enter(self):
         text_node = TextNode("press-enter")
         text_node.setText("PRESS [ENTER] TO PLAY")
@@ -103,7 +111,7 @@ class TitleScreen(DirectObject):
         fade_sequence.append(Func(self.cleanup))
         fade_sequence.append(Func(self.on_start))
 
-        fade_sequence.start()
+        self.base.tracer.interval("title-fade", fade_sequence).start()
 
     def cleanup(self):
         self.base.taskMgr.remove("LaserUpdateTask")
@@ -114,28 +122,54 @@ class TitleScreen(DirectObject):
         self.noisy_text_np.removeNode()
 
 class LaserField:
-    def __init__(self, render2d, num_lines=20):
+    """random red lines, one vertex buffer rewritten in place on every update
+
+    The lines live in a single dynamic Geom created once, so an update only
+    writes new endpoints: no nodes, geoms or buffers are allocated and the
+    driver gets the same buffer back each time."""
+
+    def __init__(self, render2d, num_lines=20, rng=random):
         self.render2d = render2d
-        self.num_lines = num_lines
+        self.rng = rng
+        self.num_lines = 0
         self.node = NodePath("laser-lines")
         self.node.reparentTo(render2d)
         self.node.setTransparency(TransparencyAttrib.MAlpha)
         self.node.setAttrib(ColorBlendAttrib.make(ColorBlendAttrib.MAdd))
+        self.node.setRenderModeThickness(2.5)
+
+        self.vdata = GeomVertexData("laser-lines", GeomVertexFormat.getV3c4(), Geom.UHDynamic)
+        self.lines = GeomLines(Geom.UHStatic)
+        self.geom = Geom(self.vdata)
+        self.geom.addPrimitive(self.lines)
+        geom_node = GeomNode("laser-lines")
+        geom_node.addGeom(self.geom)
+        self.node.attachNewNode(geom_node)
+
+        self.set_num_lines(num_lines)
+
+    def set_num_lines(self, num_lines):
+        """resizes the buffer, the only time it changes size or color"""
+        self.num_lines = num_lines
+        vdata = self.geom.modifyVertexData()
+        vdata.setNumRows(num_lines * 2)
+        color = GeomVertexWriter(vdata, "color")
+        for _ in range(num_lines * 2):
+            color.setData4f(1, 0, 0, 0.7)  # semi-transparent red
+        lines = self.geom.modifyPrimitive(0)
+        lines.clearVertices()
+        if num_lines:
+            lines.addConsecutiveVertices(0, num_lines * 2)
+            lines.closePrimitive()
         self.update_lasers()
 
     def update_lasers(self):
-        self.node.node().removeAllChildren()
-        segs = LineSegs()
-        segs.setThickness(2.5)
-        segs.setColor(1, 0, 0, 0.7)  # semi-transparent red
-
+        vertex = GeomVertexWriter(self.geom.modifyVertexData(), "vertex")
         for _ in range(self.num_lines):
-            x1, y1 = random.uniform(-1.5, 1.5), random.uniform(-1, 1)
-            x2, y2 = random.uniform(-1.5, 1.5), random.uniform(-1, 1)
-            segs.moveTo(x1, 0, y1)
-            segs.drawTo(x2, 0, y2)
-
-        self.node.attachNewNode(segs.create())
+            x1, y1 = self.rng.uniform(-1.5, 1.5), self.rng.uniform(-1, 1)
+            x2, y2 = self.rng.uniform(-1.5, 1.5), self.rng.uniform(-1, 1)
+            vertex.setData3f(x1, 0, y1)
+            vertex.setData3f(x2, 0, y2)
 
     def animate(self, task):
         self.update_lasers()
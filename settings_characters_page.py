@@ -1,5 +1,7 @@
 from direct.showbase.DirectObject import DirectObject
-from panda3d.core import CardMaker, Shader, Vec4
+from panda3d.core import CardMaker, Vec4
+from asset_cache import COMPOSITE_SHADER
+from blur import blur_texture
 import sys
 
 class CharactersSettings(DirectObject):
@@ -61,7 +63,7 @@ class CharactersSettings(DirectObject):
         self.characters_settings_root = self.base.render2d.attachNewNode("characters-setting-root")
 
         # Load and display the background image on a full-screen quad
-        tex = self.base.loader.loadTexture("assets/bg_characters.png")
+        tex = self.base.assets.texture("assets/bg_characters.png")
         cm  = CardMaker("bg_characters")
         cm.setFrame(-1, 1, -1, 1)
         card = self.characters_settings_root.attachNewNode(cm.generate())
@@ -69,12 +71,18 @@ class CharactersSettings(DirectObject):
         card.setDepthWrite(False)
         card.setBin("fixed", 50)
         card.setTexture(tex)
-        card.setShader(Shader.load(Shader.SL_GLSL,
-                                  "assets/shaders/blur.vert",
-                                  "assets/shaders/blur.frag"))
+        # the blur is rendered once and cached, the shader only composites
+        blurred = self.base.assets.generated("bg_characters-blurred", self._blur_background)
+        if blurred is not None:
+            card.setShader(self.base.assets.shader(*COMPOSITE_SHADER))
+            card.setShaderInput("blurred", blurred)
         self.card = card
         self.update_shader_box()
 
+    def _blur_background(self, name):
+        blurred = blur_texture(self.base, self.base.assets.texture("assets/bg_characters.png"))
+        return blurred, blurred.estimateTextureMemory() if blurred else 0
+
     def update_shader_box(self):
         self.card.setShaderInput("box", self.box_positions[self.current_index])
 
@@ -2,6 +2,7 @@ from direct.showbase.DirectObject import DirectObject
 from panda3d.core import TransparencyAttrib, TextNode, LineSegs, NodePath, ColorBlendAttrib, LColor
 import sys
 from settings_characters_page import CharactersSettings
+from asset_cache import BOLD_FONT
 
 class SettingsPage(DirectObject):
     def __init__(self, base, on_start_game):
@@ -20,7 +21,7 @@ class SettingsPage(DirectObject):
 
         print("SettingsPage init - press enter again")
 
-        self.bold_font = self.base.loader.loadFont("assets/fonts/Orbitron/static/Orbitron-Bold.ttf")
+        self.bold_font = self.base.assets.font(BOLD_FONT)
 
         self.show_menu()
 
@@ -0,0 +1,137 @@
+"""per turn snapshots of the game
+
+A Snapshot is an immutable picture of a GameState between two turns. It
+only holds ints and tuples, and whatever a turn did not change is the very
+object of the previous snapshot:
+
+- the board, shared by every snapshot of the game
+- inventories: a (power, money) tuple per actor, kept when unchanged
+- purchases: a linked list of (index, actor code, earlier purchases), a
+  turn that buys a tile puts one cell in front of the previous list
+- the dice stream: the 624 words of the Mersenne Twister only change
+  every few hundred rolls, until then snapshots share them and only keep
+  their position
+
+A History of a whole game costs a few small tuples per turn. Going back to
+any turn is an index into a list, and fork() turns a snapshot into a live
+GameState for the rules, the bots or an undo:
+
+    history = History()
+    history.record(state, rules.rng)        # after every end_turn
+    state = history.rewind(12, rules.rng)   # the game as turn 12 ended
+"""
+from game_rules import ACTORS, RENT_PERCENT, GameState
+from ledger import Ledger
+
+# words of the Mersenne Twister state, the last item of getstate is the position
+RNG_WORDS = 624
+
+
+class Snapshot:
+    """state between two turns, see the module docstring"""
+
+    def __init__(self, state, rng=None, previous=None):
+        self.board = state.board
+        self.turn = state.turn
+        self.actor = state.actor
+        self.dice = state.dice
+        self.loser = state.loser
+        self.finished = state.finished
+        self.positions = tuple(state.positions[actor] for actor in ACTORS)
+
+        inventories = []
+        for index, actor in enumerate(ACTORS):
+            inventory = state.inventories[actor]
+            entry = (inventory["power"], inventory["money"])
+            if previous is not None and previous.inventories[index] == entry:
+                entry = previous.inventories[index]
+            inventories.append(entry)
+        self.inventories = tuple(inventories)
+
+        ledger = state.ledger
+        purchases, count = (previous.purchases, previous.purchase_count) if previous else (None, 0)
+        for index in ledger.bought[count:]:
+            purchases = (index, ledger.owners[index], purchases)
+        self.purchases = purchases
+        self.purchase_count = len(ledger.bought)
+
+        self.rng_words = self.rng_index = None
+        if rng is not None:
+            words = rng.getstate()[1]
+            self.rng_index = words[RNG_WORDS]
+            self.rng_words = words[:RNG_WORDS]
+            if previous is not None and previous.rng_words == self.rng_words:
+                self.rng_words = previous.rng_words
+        # built on the first fork, later forks copy it
+        self._ledger = None
+
+    def purchase_list(self):
+        """(index, actor code) of every purchase, oldest first"""
+        purchases = []
+        cell = self.purchases
+        while cell is not None:
+            index, code, cell = cell
+            purchases.append((index, code))
+        purchases.reverse()
+        return purchases
+
+    def ledger(self):
+        """the ledger of the snapshot, do not change it, forks get a copy"""
+        if self._ledger is None:
+            ledger = Ledger(self.board, ACTORS, RENT_PERCENT)
+            # oldest first, the ledger keeps the order of the purchases
+            for index, code in self.purchase_list():
+                ledger.assign(index, ACTORS[code])
+            self._ledger = ledger
+        return self._ledger
+
+    def fork(self, rng=None):
+        """a live GameState of the snapshot, rng gets the dice stream back"""
+        inventories = {actor: {"power": power, "money": money, "cards": [{}]}
+                       for actor, (power, money) in zip(ACTORS, self.inventories)}
+        state = GameState(self.board, inventories, self.actor, self.turn, ledger=self.ledger().copy())
+        state.positions = dict(zip(ACTORS, self.positions))
+        state.dice = self.dice
+        state.loser = self.loser
+        state.finished = self.finished
+        if rng is not None and self.rng_words is not None:
+            rng.setstate((3, self.rng_words + (self.rng_index,), None))
+        return state
+
+
+class History:
+    """a snapshot per turn of one game"""
+
+    def __init__(self):
+        self.snapshots = []
+        # turn of the first snapshot, a replayed game does not start at 0
+        self.start = 0
+
+    def record(self, state, rng=None):
+        """snapshot of the state once its turn is over"""
+        index = state.turn - self.start
+        if not self.snapshots or not 0 <= index <= len(self.snapshots):
+            self.snapshots = []
+            self.start, index = state.turn, 0
+        # a rewound game overwrites the turns it undid
+        del self.snapshots[index:]
+        snapshot = Snapshot(state, rng, self.latest)
+        self.snapshots.append(snapshot)
+        return snapshot
+
+    @property
+    def latest(self):
+        """the snapshot of the last turn over, None before the game starts"""
+        return self.snapshots[-1] if self.snapshots else None
+
+    def __contains__(self, turn):
+        return 0 <= turn - self.start < len(self.snapshots)
+
+    def at(self, turn):
+        if turn not in self:
+            raise KeyError(f"turn {turn} is not in the history")
+        return self.snapshots[turn - self.start]
+
+    def rewind(self, turn, rng=None):
+        """the game as turn ended, the later snapshots stay until the next record"""
+        return self.at(turn).fork(rng)
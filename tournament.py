@@ -0,0 +1,114 @@
+"""tournament runner for bot strategies
+
+Every pair of strategies plays --games games in both seats across a
+process pool. Each game gets its own seed, so any single game can be
+replayed with --only-game. Results stream back to the parent one game at
+a time and are written as JSON lines, only the win table is kept in memory.
+
+    python tournament.py greedy cautious auctioneer --games 2000 --seed 7 --out results.jsonl
+"""
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from bot_strategies import STRATEGIES, get_strategy
+from game_rules import GameRules, HUMAN, BOT, MAX_TURNS
+
+
+def game_seed(base_seed, game_id):
+    """seed of a single game, stable across runs and worker counts"""
+    return base_seed * 1_000_003 + game_id
+
+
+def schedule(strategies, games, base_seed, board_size, max_turns):
+    """yields one task per game, lazily so the queue never holds them all"""
+    game_id = 0
+    for human, bot in itertools.permutations(strategies, 2):
+        for _ in range(games):
+            yield (game_id, game_seed(base_seed, game_id), human, bot, board_size, max_turns)
+            game_id += 1
+
+
+def play_game(task):
+    """worker entry point: plays one headless game and returns its summary"""
+    game_id, seed, human, bot, board_size, max_turns = task
+    rules = GameRules(board_size=board_size, max_turns=max_turns, rng=random.Random(seed))
+    strategy_rng = random.Random(f"{seed}:strategy")
+    strategies = {HUMAN: get_strategy(human, strategy_rng), BOT: get_strategy(bot, strategy_rng)}
+    state = rules.new_game()
+    while not state.over:
+        rules.play_turn(state, strategies)
+
+    winner = state.winner
+    return {
+        "game": game_id,
+        "seed": seed,
+        "human": human,
+        "bot": bot,
+        "winner": strategies[winner].name if winner else None,
+        "winner_seat": winner,
+        "bankrupt": state.loser is not None,
+        "turns": state.turn,
+        "gold": {actor: state.inventories[actor]["money"] for actor in (HUMAN, BOT)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="pit bot strategies against each other")
+    parser.add_argument("strategies", nargs="*", default=sorted(STRATEGIES),
+                        help=f"strategies to play, among: {', '.join(STRATEGIES)}")
+    parser.add_argument("--games", type=int, default=1000, help="games per pairing and seat")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--board-size", type=int, default=20)
+    parser.add_argument("--max-turns", type=int, default=MAX_TURNS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default="-", help="JSON lines file, - for stdout")
+    parser.add_argument("--only-game", type=int, default=None, help="replay a single game id")
+    args = parser.parse_args(argv)
+
+    for name in args.strategies:
+        get_strategy(name)
+    if len(args.strategies) < 2:
+        parser.error("at least two strategies are needed")
+
+    tasks = schedule(args.strategies, args.games, args.seed, args.board_size, args.max_turns)
+    if args.only_game is not None:
+        task = next(itertools.islice(tasks, args.only_game, None))
+        print(json.dumps(play_game(task)))
+        return
+
+    wins = {name: 0 for name in args.strategies}
+    played = ties = 0
+    out = sys.stdout if args.out == "-" else open(args.out, "w")
+    start = time.perf_counter()
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            for result in pool.imap_unordered(play_game, tasks, chunksize=64):
+                out.write(json.dumps(result) + "\n")
+                played += 1
+                if result["winner"]:
+                    wins[result["winner"]] += 1
+                else:
+                    ties += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    logging.info("%d games in %.1f s on %d workers", played, elapsed, args.workers)
+    # every strategy plays the same number of games
+    per_strategy = played * 2 // len(args.strategies)
+    for name, count in sorted(wins.items(), key=lambda item: -item[1]):
+        logging.info("%-12s %6d wins  %5.1f%%", name, count, 100 * count / per_strategy)
+    logging.info("%-12s %6d", "ties", ties)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()